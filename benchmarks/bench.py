@@ -0,0 +1,210 @@
+"""Benchmarks for the simulation hot path.
+
+Times Grid.update_only steps per second, Simulator.run wall time and
+AnnealingController evaluations per minute across car counts, grid sizes and
+spawn intervals. Every run is headless and seeded. Results are written as JSON
+and, when a baseline exists, compared against it; a metric that got slower by
+more than the tolerance is flagged and the exit status is 1.
+
+    python -m benchmarks.bench                        # run, compare to baseline
+    python -m benchmarks.bench --save-baseline        # record a new baseline
+    python -m benchmarks.bench --grids 4x5 8x10 --max-cars 40 160
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from simulation.grid import Grid
+from optimizer.controller import AnnealingController
+from optimizer.simulator import Simulator, ENGINES
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Whether a larger value of each metric is an improvement
+METRICS = {
+    "steps_per_sec": True,
+    "run_seconds": False,
+    "evals_per_min": True,
+}
+
+DT = 1.0 / 30.0  # Same fixed step Simulator.run uses
+
+
+def uniform_config(rows, cols, ns=6, ew=6):
+    return [{"ns_duration": ns, "ew_duration": ew} for _ in range(rows * cols)]
+
+
+def bench_steps(sim, seed, warmup, steps, repeat):
+    """Best-of-`repeat` update_only steps per second on a grid already full of traffic."""
+    best = 0.0
+    for _ in range(repeat):
+        grid = sim.make_grid(seed)
+        for _ in range(int(warmup / DT)):
+            grid.update_only(DT)
+        start = time.perf_counter()
+        for _ in range(steps):
+            grid.update_only(DT)
+        best = max(best, steps / (time.perf_counter() - start))
+        grid.close()
+    return best
+
+
+def bench_run(sim, config, seed, duration, repeat):
+    """Best-of-`repeat` wall time of one Simulator.run."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sim.run(config, duration=duration, seed=seed)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_controller(engine, rows, cols, seed, duration, seconds):
+    """Evaluations per minute of a single-worker controller that never waits between runs."""
+    controller = AnnealingController(grid=Grid(headless=True, seed=seed, rows=rows, cols=cols), run_interval=0,
+                                     engine=engine, seed=seed, cache_size=0,
+                                     min_duration=duration, max_duration=duration)
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        controller.update(0.0)
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    evaluations = controller.evaluations
+    thread = controller.eval_thread
+    if thread is not None:
+        thread.join()
+    controller.shutdown()
+    return evaluations / elapsed * 60.0
+
+
+def case_name(case):
+    return (f"{case['engine']} {case['rows']}x{case['cols']} "
+            f"cars={case['max_cars']} spawn={case['spawn_interval']}")
+
+
+def run_suite(args):
+    results = []
+    grids = [tuple(int(n) for n in g.lower().split("x")) for g in args.grids]
+    cases = itertools.product(args.engines, grids, args.max_cars, args.spawn_intervals)
+    for engine, (rows, cols), max_cars, spawn_interval in cases:
+        case = {"engine": engine, "rows": rows, "cols": cols,
+                "max_cars": max_cars, "spawn_interval": spawn_interval}
+        sim = Simulator(engine, max_cars=max_cars, spawn_interval=spawn_interval, rows=rows, cols=cols)
+        with contextlib.redirect_stdout(io.StringIO()):
+            config = uniform_config(rows, cols)
+            values = {
+                "steps_per_sec": bench_steps(sim, args.seed, args.warmup, args.steps, args.repeat),
+                "run_seconds": bench_run(sim, config, args.seed, args.duration, args.repeat),
+            }
+        for metric, value in values.items():
+            results.append({"case": case, "metric": metric, "value": value})
+        print(f"{case_name(case)}: {values['steps_per_sec']:.0f} steps/s, "
+              f"run {values['run_seconds']:.2f}s", file=sys.stderr)
+
+    # The controller sizes its own grids, so it is only swept over engine and grid size
+    if args.controller_seconds > 0:
+        for engine, (rows, cols) in itertools.product(args.engines, grids):
+            case = {"engine": engine, "rows": rows, "cols": cols, "max_cars": None, "spawn_interval": None}
+            with contextlib.redirect_stdout(io.StringIO()):
+                value = bench_controller(engine, rows, cols, args.seed, args.controller_duration, args.controller_seconds)
+            results.append({"case": case, "metric": "evals_per_min", "value": value})
+            print(f"{engine} {rows}x{cols} controller: {value:.1f} evals/min", file=sys.stderr)
+    return results
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return json.dumps(result["case"], sort_keys=True), result["metric"]
+
+
+def compare(results, baseline, tolerance):
+    """Return (result, baseline value, change) for every metric that regressed past `tolerance`."""
+    previous = {result_key(r): r["value"] for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get(result_key(result))
+        if not before:
+            continue
+        change = result["value"] / before - 1.0
+        if not METRICS[result["metric"]]:
+            change = -change  # Lower is better: a longer run is a negative change
+        if change < -tolerance:
+            regressions.append((result, before, change))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the traffic simulation hot path")
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=["object", "array"])
+    parser.add_argument("--grids", nargs="+", default=["4x5", "8x10"], help="grid sizes as ROWSxCOLS")
+    parser.add_argument("--max-cars", nargs="+", type=int, default=[40, 120])
+    parser.add_argument("--spawn-intervals", nargs="+", type=float, default=[0.5, 0.25])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--warmup", type=float, default=20.0, help="simulated seconds before steps are timed")
+    parser.add_argument("--steps", type=int, default=600, help="update_only steps timed per repeat")
+    parser.add_argument("--duration", type=float, default=30.0, help="Simulator.run duration in simulated seconds")
+    parser.add_argument("--repeat", type=int, default=3, help="repeats per timing; the best is kept")
+    parser.add_argument("--controller-seconds", type=float, default=20.0,
+                        help="wall seconds to drive the controller per case (0 = skip)")
+    parser.add_argument("--controller-duration", type=int, default=10,
+                        help="simulated seconds per controller evaluation")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before flagging (0.10 = 10%%)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "save_baseline")},
+        "results": run_suite(args),
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one", file=sys.stderr)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(report["results"], baseline, args.tolerance)
+    for result, before, change in regressions:
+        print(f"REGRESSION {case_name(result['case'])} {result['metric']}: "
+              f"{before:.3f} -> {result['value']:.3f} ({change:+.1%})", file=sys.stderr)
+    if not regressions:
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,17 @@
+import argparse
+import functools
+import json
+import os
 import pygame
 import sys
-from simulation.grid import Grid
+import time
+from simulation.grid import Grid, GRID_ROWS, GRID_COLS, default_window_size
+from simulation.profiling import PhaseTimer
+from rendering.renderer import GridRenderer
 from optimizer.controller import AnnealingController
+from optimizer.tempering import TemperingController
+from optimizer.simulator import ENGINES
+from simulation.trace import TraceRecorder, TraceReader
 
 WINDOW_WIDTH = 1200
 WINDOW_HEIGHT = 1000
@@ -19,11 +29,40 @@ HEATMAP_TOGGLE_RECT = pygame.Rect(WINDOW_WIDTH - SIDEBAR_WIDTH + 10, 590, 180, 5
 PAUSE_BUTTON_RECT = pygame.Rect(WINDOW_WIDTH - SIDEBAR_WIDTH + 10, WINDOW_HEIGHT - 50, 180, 30)
 
 SIM_SPEED = 1.0  # default time scale
+FAST_MODE = False  # Simulate flat out, drawing only every FAST_FRAME_SECONDS
+
+# The live grid advances in fixed steps, however long a frame took or however
+# fast the sim runs, so its physics match the headless evaluations
+SIM_STEP = 1.0 / 30.0
+MAX_SUBSTEPS = 60  # Per frame; a frame that needs more drops the backlog rather than stalling
+FAST_FRAME_SECONDS = 0.25  # Wall time fast mode simulates between frames
 SIM_SPEED_SECTION_TOP = 370
 SIM_SPEED_SECTION_HEIGHT = 60
 SPEED_DOWN_RECT = pygame.Rect(WINDOW_WIDTH - SIDEBAR_WIDTH + 10, SIM_SPEED_SECTION_TOP + 25, 30, 30)
 SPEED_UP_RECT = pygame.Rect(WINDOW_WIDTH - SIDEBAR_WIDTH + 160, SIM_SPEED_SECTION_TOP + 25, 30, 30)
 
+PROFILE_LINES = 6  # Slowest evaluation phases listed in the sidebar
+
+# (size, bold) of the sidebar's text styles
+HEADER_FONT = (20, True)
+SMALL_FONT = (16, False)
+
+# Fitness history the graph surface was last drawn from
+graph_points = None
+
+
+@functools.lru_cache(maxsize=None)
+def get_font(size, bold=False):
+    # SysFont scans the system fonts on every call; look each size up once
+    return pygame.font.SysFont("Arial", size, bold=bold)
+
+
+@functools.lru_cache(maxsize=1024)
+def render_text(text, color, size, bold=False):
+    # Sidebar labels mostly repeat from frame to frame; only re-render when the text changes.
+    # Callers only blit the shared surface, never draw on it.
+    return get_font(size, bold).render(text, True, color)
+
 
 def get_heatmap_button_pos():
     # Calculate dynamic position based on UI layout
@@ -35,12 +74,42 @@ def get_heatmap_button_pos():
     y += GRAPH_HEIGHT + 20  # Graph height plus spacing
     return y
 
+def dump_profile(path, controller):
+    debug = controller.get_debug_info()
+    with open(path, "w") as f:
+        json.dump({"evaluation": debug["profile"], "live_grid": debug["grid_profile"]}, f, indent=2)
+    print(f"Profile written to {path}")
+
+
+def draw_fitness_graph(graph_surface, points):
+    graph_surface.fill((20, 20, 20))
+
+    if len(points) > 1:
+        max_val = max(points)
+        min_val = min(points)
+        range_val = max(max_val - min_val, 0.05)
+
+        for i in range(len(points) - 1):
+            x1 = i * GRAPH_WIDTH // (len(points) - 1)
+            x2 = (i + 1) * GRAPH_WIDTH // (len(points) - 1)
+
+            y1 = GRAPH_HEIGHT - int((points[i] - min_val) / range_val * GRAPH_HEIGHT)
+            y2 = GRAPH_HEIGHT - int((points[i + 1] - min_val) / range_val * GRAPH_HEIGHT)
+
+            pygame.draw.line(graph_surface, (0, 255, 0), (x1, y1), (x2, y2), 2)
+            pygame.draw.circle(graph_surface, (0, 255, 0), (x1, y1), 2)
+
+        last_y = GRAPH_HEIGHT - int((points[-1] - min_val) / range_val * GRAPH_HEIGHT)
+        pygame.draw.circle(graph_surface, (0, 255, 0), (GRAPH_WIDTH - 2, last_y), 2)
+    else:
+        msg = render_text("Waiting for data...", (150, 150, 150), 14)
+        graph_surface.blit(msg, (10, GRAPH_HEIGHT // 2 - msg.get_height() // 2))
+
+
 def draw_ui(screen, graph_surface, font, grid, controller, show_heatmap, paused, fps):
     debug = controller.get_debug_info()
 
-    # Fonts
-    header_font = pygame.font.SysFont("Arial", 20, bold=True)
-    small_font = pygame.font.SysFont("Arial", 16)
+    global graph_points
     screen_width = screen.get_width()
 
 
@@ -67,8 +136,7 @@ def draw_ui(screen, graph_surface, font, grid, controller, show_heatmap, paused,
     pygame.draw.rect(screen, (40, 40, 40), (screen_width - SIDEBAR_WIDTH + 5, SIM_SPEED_SECTION_TOP, 190, SIM_SPEED_SECTION_HEIGHT), border_radius=8)
 
     # Draw "Sim Speed:" centered at the top of the box
-    speed_label_font = pygame.font.SysFont("Arial", 15)
-    speed_title = speed_label_font.render("Sim Speed:", True, TEXT_COLOR)
+    speed_title = render_text("Sim Speed:", TEXT_COLOR, 15)
     speed_title_rect = speed_title.get_rect(center=(screen_width - SIDEBAR_WIDTH + SIDEBAR_WIDTH // 2, SIM_SPEED_SECTION_TOP + 12))
     screen.blit(speed_title, speed_title_rect)
 
@@ -76,15 +144,13 @@ def draw_ui(screen, graph_surface, font, grid, controller, show_heatmap, paused,
     pygame.draw.rect(screen, (180, 180, 180), SPEED_DOWN_RECT, border_radius=4)
     pygame.draw.rect(screen, (180, 180, 180), SPEED_UP_RECT, border_radius=4)
 
-    arrow_font = pygame.font.SysFont("Arial", 20, bold=True)
-    minus_surface = arrow_font.render("<", True, (0, 0, 0))
-    plus_surface = arrow_font.render(">", True, (0, 0, 0))
+    minus_surface = render_text("<", (0, 0, 0), 20, True)
+    plus_surface = render_text(">", (0, 0, 0), 20, True)
     screen.blit(minus_surface, minus_surface.get_rect(center=SPEED_DOWN_RECT.center))
     screen.blit(plus_surface, plus_surface.get_rect(center=SPEED_UP_RECT.center))
 
     # Speed value centered between buttons
-    speed_value_font = pygame.font.SysFont("Arial", 16, bold=True)
-    value_label = speed_value_font.render(f"{SIM_SPEED:.1f}x", True, TEXT_COLOR)
+    value_label = render_text("MAX" if FAST_MODE else f"{SIM_SPEED:.1f}x", TEXT_COLOR, 16, True)
     value_rect = value_label.get_rect(center=(screen_width - SIDEBAR_WIDTH + 100, SPEED_DOWN_RECT.centery))
     screen.blit(value_label, value_rect)
 
@@ -101,80 +167,61 @@ def draw_ui(screen, graph_surface, font, grid, controller, show_heatmap, paused,
     temp_color = (r, g, b)
     
     lines = [
-        (header_font, "Live Traffic Stats:", TEXT_COLOR),
-        (small_font, f"FPS: {fps:.1f}", TEXT_COLOR),
-        (small_font, f"Avg Wait: {grid.avg_wait_time:.1f}s", TEXT_COLOR),
-        # (small_font, f"Cars in grid: {debug['cars_in_grid']:.2f}", TEXT_COLOR),
-        (small_font, f"Last Eval: {controller.last_throughput:.1f} cars/min", TEXT_COLOR),
-        (small_font, f"Best: {controller.best_throughput:.1f} cars/min" if hasattr(controller, 'best_throughput') else "Best: 0.0 cars/min", COLOR_GREEN),
+        (HEADER_FONT, "Live Traffic Stats:", TEXT_COLOR),
+        (SMALL_FONT, f"FPS: {fps:.1f}", TEXT_COLOR),
+        (SMALL_FONT, f"Avg Wait: {grid.avg_wait_time:.1f}s", TEXT_COLOR),
+        # (SMALL_FONT, f"Cars in grid: {debug['cars_in_grid']:.2f}", TEXT_COLOR),
+        (SMALL_FONT, f"Last Eval: {controller.last_throughput:.1f} cars/min", TEXT_COLOR),
+        (SMALL_FONT, f"Best: {controller.best_throughput:.1f} cars/min" if hasattr(controller, 'best_throughput') else "Best: 0.0 cars/min", COLOR_GREEN),
         
-        (header_font, "", TEXT_COLOR),
-        (header_font, "Annealing Debug:", TEXT_COLOR),
-        (small_font, f"Best Fitness: {debug['best_fitness']:.2f}", TEXT_COLOR),
-        (small_font, f"Last Fitness: {debug['current_fitness']:.2f}", TEXT_COLOR),
-        (small_font, f"Temp: {debug['temperature']:.2f}", temp_color),
-        (small_font, f"Last Sim Cars: {debug['cars_processed']}", TEXT_COLOR),
-        (small_font, f"Max Sim Cars: {debug['max_cars']}", TEXT_COLOR),
-        (small_font, f"Next Mutation: {debug['countdown']:.1f}s", TEXT_COLOR),
-        (small_font, "Status:", TEXT_COLOR),
-        (small_font, status, status_color),
-        (small_font, "", TEXT_COLOR),
-        (small_font, "", TEXT_COLOR),
-        (small_font, "", TEXT_COLOR),
-        (small_font, "", TEXT_COLOR),
-        (header_font, "Fitness Trend", TEXT_COLOR),
+        (HEADER_FONT, "", TEXT_COLOR),
+        (HEADER_FONT, "Annealing Debug:", TEXT_COLOR),
+        (SMALL_FONT, f"Best Fitness: {debug['best_fitness']:.2f}", TEXT_COLOR),
+        (SMALL_FONT, f"Last Fitness: {debug['current_fitness']:.2f}", TEXT_COLOR),
+        (SMALL_FONT, f"Temp: {debug['temperature']:.2f}", temp_color),
+        (SMALL_FONT, f"Last Sim Cars: {debug['cars_processed']}", TEXT_COLOR),
+        (SMALL_FONT, f"Max Sim Cars: {debug['max_cars']}", TEXT_COLOR),
+        (SMALL_FONT, f"Next Mutation: {debug['countdown']:.1f}s", TEXT_COLOR),
+        (SMALL_FONT, "Status:", TEXT_COLOR),
+        (SMALL_FONT, status, status_color),
+        (SMALL_FONT, f"Cache: {debug['cache_hits']} hits / {debug['cache_misses']} misses", TEXT_COLOR),
+        (SMALL_FONT, f"Early stops: {debug['early_stops']}", TEXT_COLOR),
+        (SMALL_FONT, f"Screened {debug['budget']['screened']}, promoted {debug['budget']['promoted']}, "
+                     f"{debug['budget']['sim_seconds']:.0f}s simulated" if debug['budget']['screened'] else "", TEXT_COLOR),
+        (SMALL_FONT, f"Surrogate error {debug['surrogate']['recent_mae']:.2f} ({debug['surrogate']['samples']} samples)"
+                     if debug['surrogate'] else "", TEXT_COLOR),
+        (SMALL_FONT, f"Round {debug['round']}/{debug['rounds']}, swaps {100 * debug['swap_rate']:.0f}%"
+                     if "chains" in debug else "", TEXT_COLOR),
+        (SMALL_FONT, "", TEXT_COLOR),
+        (HEADER_FONT, "Fitness Trend", TEXT_COLOR),
 
     ]
 
     y = 20
-    for font_type, text, color in lines:
-        label_surface = font_type.render(text, True, color)
+    for font_spec, text, color in lines:
+        label_surface = render_text(text, color, *font_spec)
         if label_surface.get_width() > max_text_width:
             # Truncate text if needed
             max_chars = int(len(text) * max_text_width / label_surface.get_width()) - 3
             text = text[:max_chars] + "..."
-            label_surface = font_type.render(text, True, color)
+            label_surface = render_text(text, color, *font_spec)
 
         screen.blit(label_surface, (draw_x, y))
-        y += font_type.get_linesize() + 4
+        y += get_font(*font_spec).get_linesize() + 4
 
 
-    # Fitness graph
+    # Fitness graph, redrawn only when the history has changed
     points = debug.get("fitness_history", [])
-    graph_surface.fill((20, 20, 20))
-
-    if len(points) > 1:
-        max_val = max(points)
-        min_val = min(points)
-        range_val = max(max_val - min_val, 0.05)
-
-        for i in range(len(points) - 1):
-            x1 = i * GRAPH_WIDTH // (len(points) - 1)
-            x2 = (i + 1) * GRAPH_WIDTH // (len(points) - 1)
-
-            y1 = GRAPH_HEIGHT - int((points[i] - min_val) / range_val * GRAPH_HEIGHT)
-            y2 = GRAPH_HEIGHT - int((points[i + 1] - min_val) / range_val * GRAPH_HEIGHT)
-
-            pygame.draw.line(graph_surface, (0, 255, 0), (x1, y1), (x2, y2), 2)
-            pygame.draw.circle(graph_surface, (0, 255, 0), (x1, y1), 2)
-
-        last_y = GRAPH_HEIGHT - int((points[-1] - min_val) / range_val * GRAPH_HEIGHT)
-        pygame.draw.circle(graph_surface, (0, 255, 0), (GRAPH_WIDTH - 2, last_y), 2)
-    else:
-        placeholder_font = pygame.font.SysFont("Arial", 14)
-        msg = placeholder_font.render("Waiting for data...", True, (150, 150, 150))
-        graph_surface.blit(msg, (10, GRAPH_HEIGHT // 2 - msg.get_height() // 2))
-
+    if points != graph_points:
+        draw_fitness_graph(graph_surface, points)
+        graph_points = list(points)
     screen.blit(graph_surface, (draw_x, y))
 
     # Update y position for controls after the graph
     y += GRAPH_HEIGHT + 20
 
     # Draw the heatmap toggle button (positioned dynamically)
-    checkbox_label = "Show Heatmap"
-    checkbox_font = pygame.font.SysFont("Arial", 16)
-    checkbox_surface = checkbox_font.render(checkbox_label, True, TEXT_COLOR)
-    screen.blit(checkbox_surface, (draw_x, y))
+    screen.blit(render_text("Show Heatmap", TEXT_COLOR, 16), (draw_x, y))
 
     box_size = 20
     box_rect = pygame.Rect(draw_x + 130, y, box_size, box_size)
@@ -185,6 +232,18 @@ def draw_ui(screen, graph_surface, font, grid, controller, show_heatmap, paused,
                             (box_rect.centerx - 2, box_rect.bottom - 4), 2)
         pygame.draw.line(screen, (0, 0, 0), (box_rect.centerx - 2, box_rect.bottom - 4),
                             (box_rect.right - 4, box_rect.top + 4), 2)
+
+    # Share of evaluation time spent in each phase (phases nest, so they overlap)
+    profile = debug["profile"]
+    eval_total = profile.get("evaluation", {}).get("total_s", 0.0)
+    if eval_total > 0:
+        y += box_size + 15
+        screen.blit(render_text("Eval profile:", TEXT_COLOR, *SMALL_FONT), (draw_x, y))
+        phases = [(phase, stats) for phase, stats in profile.items() if phase != "evaluation"]
+        for phase, stats in phases[:PROFILE_LINES]:
+            y += get_font(*SMALL_FONT).get_linesize()
+            text = f"{phase}: {100 * stats['total_s'] / eval_total:.0f}%"
+            screen.blit(render_text(text, TEXT_COLOR, *SMALL_FONT), (draw_x, y))
         
     
 
@@ -200,8 +259,7 @@ def draw_ui(screen, graph_surface, font, grid, controller, show_heatmap, paused,
 
     pygame.draw.rect(screen, pause_color, PAUSE_BUTTON_RECT, border_radius=6)
 
-    pause_font = pygame.font.SysFont("Arial", 16, bold=True)
-    pause_surface = pause_font.render(pause_label, True, (0, 0, 0))
+    pause_surface = render_text(pause_label, (0, 0, 0), 16, True)
     pause_rect = pause_surface.get_rect(center=PAUSE_BUTTON_RECT.center)
     screen.blit(pause_surface, pause_rect)
 
@@ -209,19 +267,216 @@ def draw_ui(screen, graph_surface, font, grid, controller, show_heatmap, paused,
 
 
 
+def parse_tiles(text):
+    try:
+        tile_rows, tile_cols = (int(n) for n in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected ROWSxCOLS, got {text!r}")
+    return tile_rows, tile_cols
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Traffic Flow Optimization")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes used to evaluate mutations in parallel (1 = single background thread)")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="mutations evaluated per temperature step (defaults to --workers; needs --workers > 1)")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="object",
+                        help="simulation engine used for headless evaluations")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for mutations and evaluation traffic (reproducible optimization)")
+    parser.add_argument("--crn", action="store_true",
+                        help="common random numbers: evaluate every config under identical traffic")
+    parser.add_argument("--cache-path", default=None,
+                        help="JSON file that persists evaluation results across runs")
+    parser.add_argument("--warm-start", action="store_true",
+                        help="fork evaluations from a snapshot of the incumbent's settled traffic")
+    parser.add_argument("--early-stop", action="store_true",
+                        help="stop evaluations once a candidate is clearly accepted or rejected")
+    parser.add_argument("--halving", action="store_true",
+                        help="successive halving: screen many mutations on short runs, simulate only the best at full length")
+    parser.add_argument("--halving-candidates", type=int, default=8,
+                        help="mutations screened per step with --halving")
+    parser.add_argument("--halving-eta", type=int, default=2,
+                        help="1/eta of each rung is promoted to a run eta times longer")
+    parser.add_argument("--screen-duration", type=int, default=15,
+                        help="simulated seconds of the first, cheapest screening rung")
+    parser.add_argument("--surrogate", action="store_true",
+                        help="rank mutations with a regression on past results and simulate only the most promising")
+    parser.add_argument("--surrogate-candidates", type=int, default=32,
+                        help="mutations the --surrogate scores per simulated candidate batch")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each phase of the simulation loop and evaluations (P dumps the timings)")
+    parser.add_argument("--profile-out", default="profile.json",
+                        help="file the --profile timings are written to on P and at exit")
+    parser.add_argument("--rows", type=int, default=GRID_ROWS, help="intersection rows in the grid")
+    parser.add_argument("--cols", type=int, default=GRID_COLS, help="intersection columns in the grid")
+    parser.add_argument("--tiles", type=parse_tiles, default=(2, 2),
+                        help="ROWSxCOLS tiles (one process each) for --engine partitioned")
+    parser.add_argument("--optimizer", choices=["annealing", "tempering"], default="annealing",
+                        help="simulated annealing, or parallel tempering across several chains")
+    parser.add_argument("--chains", type=int, default=4,
+                        help="temperature chains for --optimizer tempering (pair with --workers)")
+    parser.add_argument("--checkpoint", default=None,
+                        help="file the optimizer and live grid are checkpointed to periodically and at exit")
+    parser.add_argument("--checkpoint-interval", type=float, default=60.0,
+                        help="wall seconds between checkpoints")
+    parser.add_argument("--resume", action="store_true",
+                        help="resume from the --checkpoint file if it exists")
+    parser.add_argument("--fast", action="store_true",
+                        help="start in fast mode: simulate as fast as possible, redrawing a few times a second (F toggles)")
+    parser.add_argument("--record", default=None,
+                        help="directory the live grid's trajectory is recorded to")
+    parser.add_argument("--replay", nargs="+", default=None, metavar="TRACE",
+                        help="replay recorded traces instead of simulating (Tab switches between them)")
+    return parser.parse_args()
+
+
+def draw_replay_ui(screen, reader, name, tick, speed, playing, seek_rect):
+    screen_width = screen.get_width()
+    pygame.draw.rect(screen, (50, 50, 50), (screen_width - SIDEBAR_WIDTH, 0, SIDEBAR_WIDTH, screen.get_height()))
+    draw_x = screen_width - SIDEBAR_WIDTH + SIDEBAR_PADDING
+
+    start, end = reader.car_rows(tick)
+    lines = [
+        (HEADER_FONT, "Replay:", TEXT_COLOR),
+        (SMALL_FONT, name, COLOR_GREEN),
+        (SMALL_FONT, f"Time: {reader.time[tick]:.1f}s / {reader.duration:.1f}s", TEXT_COLOR),
+        (SMALL_FONT, f"Tick: {tick + 1}/{len(reader)}", TEXT_COLOR),
+        (SMALL_FONT, f"Cars: {end - start}", TEXT_COLOR),
+        (SMALL_FONT, f"Speed: {speed:.1f}x {'playing' if playing else 'paused'}", TEXT_COLOR),
+        (SMALL_FONT, "", TEXT_COLOR),
+        (SMALL_FONT, "Space: play/pause", TEXT_COLOR),
+        (SMALL_FONT, "Left/Right: seek 5s", TEXT_COLOR),
+        (SMALL_FONT, ", / . : step a tick", TEXT_COLOR),
+        (SMALL_FONT, "+/-: speed, H: heatmap", TEXT_COLOR),
+        (SMALL_FONT, "Tab: next trace", TEXT_COLOR),
+    ]
+    y = 20
+    for font_spec, text, color in lines:
+        screen.blit(render_text(text, color, *font_spec), (draw_x, y))
+        y += get_font(*font_spec).get_linesize() + 4
+
+    # Seek bar; click anywhere on it to jump
+    pygame.draw.rect(screen, (100, 100, 100), seek_rect)
+    done = (tick + 1) / len(reader)
+    pygame.draw.rect(screen, COLOR_GREEN, (seek_rect.x, seek_rect.y, int(seek_rect.width * done), seek_rect.height))
+
+
+def run_replay(paths):
+    """Play back recorded traces (see simulation.trace) without simulating."""
+    readers = [TraceReader(path) for path in paths]
+    for path, reader in zip(paths, readers):
+        if not len(reader):
+            raise SystemExit(f"{path} has no recorded ticks")
+
+    pygame.init()
+    screen = pygame.display.set_mode(readers[0].window_size)
+    pygame.display.set_caption("Traffic Flow Replay")
+    renderer = GridRenderer(background=BG_COLOR)
+    seek_rect = pygame.Rect(screen.get_width() - SIDEBAR_WIDTH + SIDEBAR_PADDING, screen.get_height() - 50,
+                            SIDEBAR_WIDTH - 2 * SIDEBAR_PADDING, 16)
+
+    def layout(reader):
+        # A grid only for its geometry; the trace supplies cars and lights
+        return Grid(headless=True, window_size=reader.window_size, rows=reader.rows, cols=reader.cols)
+
+    current = 0
+    reader = readers[current]
+    grid = layout(reader)
+    clock = pygame.time.Clock()
+    t, tick = 0.0, 0
+    speed, playing, show_heatmap = 1.0, True, False
+    running = True
+    while running:
+        dt = clock.tick(60) / 1000.0
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    playing = not playing
+                elif event.key == pygame.K_RIGHT:
+                    t = min(reader.duration, t + 5.0)
+                elif event.key == pygame.K_LEFT:
+                    t = max(0.0, t - 5.0)
+                elif event.key in (pygame.K_PERIOD, pygame.K_COMMA):
+                    playing = False
+                    step = 1 if event.key == pygame.K_PERIOD else -1
+                    t = float(reader.time[max(0, min(len(reader) - 1, tick + step))])
+                elif event.key in (pygame.K_EQUALS, pygame.K_PLUS):
+                    speed = min(10.0, speed + 0.5)
+                elif event.key == pygame.K_MINUS:
+                    speed = max(0.5, speed - 0.5)
+                elif event.key == pygame.K_h:
+                    show_heatmap = not show_heatmap
+                elif event.key == pygame.K_TAB:
+                    # Same moment in the next trace, to compare configs side by side
+                    current = (current + 1) % len(readers)
+                    reader = readers[current]
+                    grid = layout(reader)
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and seek_rect.collidepoint(event.pos):
+                t = reader.duration * (event.pos[0] - seek_rect.x) / seek_rect.width
+
+        if playing:
+            t = min(reader.duration, t + dt * speed)
+        tick = reader.tick_at(t)
+        reader.apply(grid, tick)
+
+        renderer.draw(screen, grid, show_heatmap=show_heatmap)  # Covers the whole screen
+        draw_replay_ui(screen, reader, paths[current], tick, speed, playing, seek_rect)
+        pygame.display.flip()
+
+    pygame.quit()
+
+
+def advance(grid, controller, steps):
+    # Fixed-size steps; the controller sees the same simulated time as the grid
+    for _ in range(steps):
+        controller.update(SIM_STEP)
+        grid.update_only(SIM_STEP, SIM_STEP / SIM_SPEED)
+
+
 def main():
-    global SIM_SPEED
+    global SIM_SPEED, FAST_MODE
+    args = parse_args()
+    FAST_MODE = args.fast
+    if args.replay:
+        run_replay(args.replay)
+        return
     paused = True 
     notification_text = ""
     notification_timer = 0.0
     pygame.init()
-    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    # The window the optimizer's headless grids are laid out in, so the live grid
+    # shares their geometry (the classic 1200x1000 until the grid outgrows it)
+    screen = pygame.display.set_mode(default_window_size(args.rows, args.cols))
     pygame.display.set_caption("Traffic Flow Optimization")
+    # Sidebar buttons are placed for the classic width; keep them on the sidebar
+    for rect in (HEATMAP_TOGGLE_RECT, PAUSE_BUTTON_RECT, SPEED_DOWN_RECT, SPEED_UP_RECT):
+        rect.x += screen.get_width() - WINDOW_WIDTH
     show_heatmap = False
 
-    font = pygame.font.SysFont("Arial", 20)
-    grid = Grid()
-    controller = AnnealingController(grid=grid)
+    font = get_font(20)
+    grid = Grid(window_size=screen.get_size(), rows=args.rows, cols=args.cols)
+    if args.profile:
+        grid.profiler = PhaseTimer()
+    if args.record:
+        grid.recorder = TraceRecorder(args.record, grid)
+    renderer = GridRenderer(background=BG_COLOR)
+    options = dict(workers=args.workers, batch_size=args.batch_size, engine=args.engine,
+                   cache_path=args.cache_path, seed=args.seed, common_random_numbers=args.crn,
+                   warm_start=args.warm_start, early_stopping=args.early_stop,
+                   successive_halving=args.halving, halving_candidates=args.halving_candidates,
+                   halving_eta=args.halving_eta, screen_duration=args.screen_duration,
+                   surrogate=args.surrogate, surrogate_candidates=args.surrogate_candidates,
+                   profile=args.profile, tiles=args.tiles, checkpoint_path=args.checkpoint,
+                   checkpoint_interval=args.checkpoint_interval,
+                   resume_from=args.checkpoint if args.resume and args.checkpoint and os.path.exists(args.checkpoint) else None)
+    if args.optimizer == "tempering":
+        controller = TemperingController(grid=grid, chains=args.chains, **options)
+    else:
+        controller = AnnealingController(grid=grid, **options)
     clock = pygame.time.Clock()
     running = True
     last_status_message = None
@@ -230,9 +485,10 @@ def main():
     notif_surface = pygame.Surface((500, 50), pygame.SRCALPHA)
     pause_overlay = pygame.Surface((500, 50), pygame.SRCALPHA)
     PAUSE_BUTTON_RECT.y = screen.get_height() - 80
+    sim_backlog = 0.0  # Simulated seconds owed to the grid, less than a step once caught up
     
     while running:
-        dt = clock.tick(60) / 1000.0 
+        dt = clock.tick(0 if FAST_MODE else 60) / 1000.0
         fps = clock.get_fps()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -246,9 +502,14 @@ def main():
                     show_heatmap = not show_heatmap
                 elif event.key == pygame.K_SPACE:
                     paused = not paused
+                elif event.key == pygame.K_f:
+                    FAST_MODE = not FAST_MODE
+                    sim_backlog = 0.0
+                elif event.key == pygame.K_p and args.profile:
+                    dump_profile(args.profile_out, controller)
             elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 heatmap_y = get_heatmap_button_pos()
-                box_click_rect = pygame.Rect(WINDOW_WIDTH - SIDEBAR_WIDTH + 10 + 130, heatmap_y, 20, 20)
+                box_click_rect = pygame.Rect(screen.get_width() - SIDEBAR_WIDTH + 10 + 130, heatmap_y, 20, 20)
                 if box_click_rect.collidepoint(event.pos):
                     show_heatmap = not show_heatmap
                 if PAUSE_BUTTON_RECT.collidepoint(event.pos):
@@ -268,30 +529,33 @@ def main():
                 notification_timer = 2.5
             last_status_message = controller.status_message
 
-        if not paused:
-            controller.update(dt * SIM_SPEED)
-
-
-        screen.fill(BG_COLOR)
-        
-        scaled_dt = 0 if paused else dt * SIM_SPEED
-        real_dt = 0 if paused else dt
-
-        grid.draw(screen, scaled_dt, show_heatmap=show_heatmap, real_dt=real_dt)
+        if not paused and FAST_MODE:
+            # Simulate until it's time to show a frame
+            deadline = time.perf_counter() + FAST_FRAME_SECONDS
+            while time.perf_counter() < deadline:
+                advance(grid, controller, 10)
+        elif not paused:
+            sim_backlog += dt * SIM_SPEED
+            steps = int(sim_backlog / SIM_STEP)
+            if steps > MAX_SUBSTEPS:
+                steps, sim_backlog = MAX_SUBSTEPS, MAX_SUBSTEPS * SIM_STEP
+            sim_backlog -= steps * SIM_STEP
+            advance(grid, controller, steps)
+
+        renderer.draw(screen, grid, show_heatmap=show_heatmap)  # Covers the whole screen
 
         draw_ui(screen, graph_surface, font, grid, controller, show_heatmap, paused, fps)
 
-        sim_width = WINDOW_WIDTH - SIDEBAR_WIDTH
+        sim_width = screen.get_width() - SIDEBAR_WIDTH
         text_rect = pygame.Rect(0, 0, 500, 50)
-        text_rect.center = (sim_width // 2, WINDOW_HEIGHT // 2)
+        text_rect.center = (sim_width // 2, screen.get_height() // 2)
 
         # "Better Config" notification
         if notification_timer > 0:
             notification_timer -= dt
             alpha = int(255 * min(1.0, notification_timer / 0.5)) if notification_timer < 0.5 else 255
             notif_surface.fill((0, 0, 0, 180))
-            font_big = pygame.font.SysFont("Arial", 24, bold=True)
-            text = font_big.render(notification_text, True, (255, 255, 255))
+            text = render_text(notification_text, (255, 255, 255), 24, True)
             notif_surface.blit(text, (250 - text.get_width() // 2, 10))
             notif_surface.set_alpha(alpha)
             screen.blit(notif_surface, text_rect)
@@ -299,14 +563,18 @@ def main():
         # "Paused" overlay
         if paused:
             pause_overlay.fill((0, 0, 0, 180))
-            pause_font = pygame.font.SysFont("Arial", 24, bold=True)
-            pause_text = pause_font.render("⏸ Paused", True, (255, 255, 255))
+            pause_text = render_text("⏸ Paused", (255, 255, 255), 24, True)
             pause_overlay.blit(pause_text, (250 - pause_text.get_width() // 2, 10))
             pause_overlay.set_alpha(200)
             screen.blit(pause_overlay, text_rect)
 
         pygame.display.flip()
 
+    if args.profile:
+        dump_profile(args.profile_out, controller)
+    controller.shutdown()
+    if grid.recorder is not None:
+        grid.recorder.close()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,207 @@
+"""Headless batch optimization.
+
+Drives an AnnealingController (or TemperingController) with no window and no
+wait between evaluations: the next candidate is launched the moment the last
+result is in, so a run takes only as long as its simulations. Every evaluated
+config is streamed as one JSON object per line, flushed as it completes:
+
+    python -m optimizer.batch --seed 1 --workers 4 --output run.jsonl
+    python -m optimizer.batch --optimizer tempering --chains 4 --rounds 50 --output -
+
+Progress messages go to stderr, so `--output -` leaves stdout pure JSON lines.
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import sys
+import time
+
+from simulation.grid import Grid, GRID_ROWS, GRID_COLS
+from optimizer.controller import AnnealingController
+from optimizer.simulator import ENGINES, is_gridlocked
+from optimizer.tempering import TemperingController
+
+
+# Shortest evaluation worth running: Simulator.run's 5 s warmup plus time for
+# cars to cross the grid. Shorter runs process no cars, every result is rejected
+# and the schedule never cools.
+MIN_EVAL_DURATION = 15
+
+
+def evaluation_records(results, durations, taken, wall_time):
+    # One JSON-safe dict per (config, fitness, throughput, cars_processed) result
+    for (config, fitness, throughput, cars_processed), duration, accepted in zip(results, durations, taken):
+        gridlocked = is_gridlocked((fitness, throughput))
+        yield {
+            "config": [[cfg["ns_duration"], cfg["ew_duration"]] for cfg in config],
+            "fitness": None if gridlocked or not math.isfinite(fitness) else fitness,
+            "throughput": throughput,
+            "cars_processed": cars_processed,
+            "gridlocked": gridlocked,
+            "accepted": accepted,
+            "duration": duration,
+            "wall_time": wall_time,
+        }
+
+
+def optimize(controller, emit, max_rejections=20):
+    """Run `controller` until it locks in its best config, calling `emit(record)` per evaluation.
+
+    Each record carries the candidate's config (as [ns, ew] per intersection),
+    its fitness (None if it gridlocked), throughput, cars processed, whether the
+    optimizer took it, the seconds actually simulated and the wall seconds its
+    evaluation (or batch) took, plus the optimizer's temperature and best fitness
+    once the result was consumed. Returns the number of evaluations emitted.
+
+    Rejected rounds (every result gridlocked or without a car through) don't
+    move the schedule, so after `max_rejections` of them in a row this raises
+    RuntimeError rather than looping forever.
+    """
+    count = 0
+    rejections = 0
+    started = time.perf_counter()
+    while not controller.optimization_locked:
+        thread = controller.eval_thread
+        if thread is not None:
+            thread.join()
+        results = controller.pending_result
+        durations = controller.pending_durations
+        wall_time = time.perf_counter() - started
+        # No interval to wait out: consume the results, and launch the next candidates on the next pass
+        taken = controller.update(controller.interval)
+        if controller.eval_thread is not None and taken is None:
+            started = time.perf_counter()
+        if taken is None:
+            continue
+        for record in evaluation_records(results, durations, taken, wall_time):
+            count += 1
+            emit({
+                "evaluation": count,
+                **record,
+                "temperature": controller.T,
+                "best_fitness": controller.best_fitness,
+                "status": controller.status_message,
+            })
+        started = time.perf_counter()
+        rejections = rejections + 1 if controller.status_message == controller.STATUS_REJECTED else 0
+        if rejections >= max_rejections:
+            raise RuntimeError(f"{rejections} rounds in a row were rejected (gridlocked or no cars through); "
+                               f"try a longer --min-duration or lighter traffic")
+    return count
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Optimize signal timings headless, streaming evaluations as JSON lines")
+    parser.add_argument("--output", default="-", help="JSON-lines file the evaluations are written to ('-' = stdout)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed for mutations and evaluation traffic (reproducible optimization)")
+    parser.add_argument("--crn", action="store_true",
+                        help="common random numbers: evaluate every config under identical traffic")
+    parser.add_argument("--workers", type=int, default=1, help="processes used to evaluate mutations in parallel")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="mutations evaluated per temperature step (defaults to --workers; needs --workers > 1)")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="object",
+                        help="simulation engine used for evaluations")
+    parser.add_argument("--rows", type=int, default=GRID_ROWS, help="intersection rows in the grid")
+    parser.add_argument("--cols", type=int, default=GRID_COLS, help="intersection columns in the grid")
+    parser.add_argument("--optimizer", choices=["annealing", "tempering"], default="annealing",
+                        help="simulated annealing, or parallel tempering across several chains")
+    parser.add_argument("--T-start", type=float, default=150, help="starting temperature")
+    parser.add_argument("--T-min", type=float, default=1, help="annealing stops once cooled to this temperature")
+    parser.add_argument("--alpha", type=float, default=0.95, help="cooling factor per evaluated mutation")
+    parser.add_argument("--chains", type=int, default=4, help="temperature chains for --optimizer tempering")
+    parser.add_argument("--rounds", type=int, default=100, help="rounds for --optimizer tempering")
+    parser.add_argument("--min-duration", type=int, default=20,
+                        help=f"simulated seconds per evaluation while hot (at least {MIN_EVAL_DURATION})")
+    parser.add_argument("--max-duration", type=int, default=90, help="simulated seconds per evaluation once cool")
+    parser.add_argument("--cache-path", default=None, help="JSON file that persists evaluation results across runs")
+    parser.add_argument("--warm-start", action="store_true",
+                        help="fork evaluations from a snapshot of the incumbent's settled traffic")
+    parser.add_argument("--early-stop", action="store_true",
+                        help="stop evaluations once a candidate is clearly accepted or rejected")
+    parser.add_argument("--halving", action="store_true",
+                        help="successive halving: screen many mutations on short runs, simulate only the best at full length")
+    parser.add_argument("--halving-candidates", type=int, default=8, help="mutations screened per step with --halving")
+    parser.add_argument("--halving-eta", type=int, default=2,
+                        help="1/eta of each rung is promoted to a run eta times longer")
+    parser.add_argument("--screen-duration", type=int, default=15,
+                        help=f"simulated seconds of the first, cheapest screening rung (at least {MIN_EVAL_DURATION})")
+    parser.add_argument("--surrogate", action="store_true",
+                        help="rank mutations with a regression on past results and simulate only the most promising")
+    parser.add_argument("--surrogate-candidates", type=int, default=32,
+                        help="mutations the --surrogate scores per simulated candidate batch")
+    parser.add_argument("--max-rejections", type=int, default=20,
+                        help="give up after this many rounds in a row are rejected as gridlocked")
+    parser.add_argument("--checkpoint", default=None,
+                        help="file the optimizer is checkpointed to periodically and at exit")
+    parser.add_argument("--checkpoint-interval", type=float, default=60.0, help="wall seconds between checkpoints")
+    parser.add_argument("--resume", action="store_true", help="resume from the --checkpoint file if it exists")
+    args = parser.parse_args(argv)
+    if args.min_duration < MIN_EVAL_DURATION:
+        parser.error(f"--min-duration must be at least {MIN_EVAL_DURATION}s: shorter runs get no cars through")
+    if args.halving and args.screen_duration < MIN_EVAL_DURATION:
+        parser.error(f"--screen-duration must be at least {MIN_EVAL_DURATION}s: shorter rungs get no cars through "
+                     f"and can't be told apart")
+    if args.max_duration < args.min_duration:
+        parser.error("--max-duration must be at least --min-duration")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    to_stdout = args.output == "-"
+    out = sys.stdout if to_stdout else open(args.output, "w")
+
+    def emit(record):
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+
+    # The controller reports progress with print(); keep it out of a JSON stream on stdout
+    with contextlib.redirect_stdout(sys.stderr) if to_stdout else contextlib.nullcontext():
+        grid = Grid(headless=True, seed=args.seed, rows=args.rows, cols=args.cols)
+        options = dict(run_interval=0, T_start=args.T_start, T_min=args.T_min, alpha=args.alpha,
+                       workers=args.workers, batch_size=args.batch_size, engine=args.engine,
+                       cache_path=args.cache_path, seed=args.seed, common_random_numbers=args.crn,
+                       min_duration=args.min_duration, max_duration=args.max_duration,
+                       warm_start=args.warm_start, early_stopping=args.early_stop,
+                       successive_halving=args.halving, halving_candidates=args.halving_candidates,
+                       halving_eta=args.halving_eta, screen_duration=args.screen_duration,
+                       surrogate=args.surrogate, surrogate_candidates=args.surrogate_candidates,
+                       checkpoint_path=args.checkpoint, checkpoint_interval=args.checkpoint_interval,
+                       resume_from=args.checkpoint if args.resume and args.checkpoint and os.path.exists(args.checkpoint) else None)
+        if args.optimizer == "tempering":
+            controller = TemperingController(grid=grid, chains=args.chains, rounds=args.rounds, **options)
+        else:
+            controller = AnnealingController(grid=grid, **options)
+
+        start = time.perf_counter()
+        try:
+            count = optimize(controller, emit, args.max_rejections)
+        except RuntimeError as error:
+            print(f"Stopped: {error}", file=sys.stderr)
+            return 1
+        finally:
+            controller.shutdown()
+            if not to_stdout:
+                out.close()
+
+    debug = controller.get_debug_info()
+    summary = {
+        "best_fitness": controller.best_fitness,
+        "best_throughput": controller.best_throughput,
+        "best_config": [[cfg["ns_duration"], cfg["ew_duration"]] for cfg in controller.best_config],
+        "evaluations": count,
+        "simulations": controller.evaluations,
+        "budget": debug["budget"],
+        "surrogate": debug["surrogate"],
+        "wall_time": time.perf_counter() - start,
+    }
+    print(json.dumps(summary), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
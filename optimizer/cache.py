@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def config_key(config):
+    """Canonical hashable form of a signal config: ((ns, ew), ...) in intersection order."""
+    return tuple((cfg["ns_duration"], cfg["ew_duration"]) for cfg in config)
+
+
+def settings_fingerprint(settings):
+    """Canonical string form of a dict of simulation settings, for cache keys."""
+    return json.dumps(settings, sort_keys=True)
+
+
+class EvaluationCache:
+    """LRU cache of simulation results keyed by (config, duration, seed, context, settings).
+
+    `context` names anything else the result depends on, such as the warm-start
+    snapshot the run forked from (None for runs from an empty grid). `settings`
+    describes the simulator every result came from (engine, grid size, traffic,
+    gridlock timeout, ...); it's part of every key, so a persisted cache shared
+    by runs with different settings never hands one run another's results.
+
+    Results are (fitness, throughput, cars_processed, simulated), `simulated`
+    being the seconds the run actually measured (less than `duration` for a run
+    aborted on gridlock).
+
+    With a `path`, entries are loaded at startup and written back by save(), so
+    repeated or resumed optimization runs skip configs they already simulated.
+    """
+
+    def __init__(self, max_entries=1024, path=None, settings=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.settings = settings_fingerprint(settings or {})
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def key(self, config, duration, seed=None, context=None):
+        return (config_key(config), duration, seed, context, self.settings)
+
+    def get(self, config, duration, seed=None, context=None):
+        key = self.key(config, duration, seed, context)
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, config, duration, result, seed=None, context=None):
+        if self.max_entries <= 0:
+            return
+        key = self.key(config, duration, seed, context)
+        with self.lock:
+            self.entries[key] = tuple(result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def load(self):
+        with open(self.path) as f:
+            data = json.load(f)
+        for entry in data["entries"][-self.max_entries:]:
+            if len(entry) < 6:
+                continue  # Saved before settings were recorded; no telling what they were simulated under
+            config, duration, seed, context, settings, result = entry
+            key = (tuple(tuple(pair) for pair in config), duration, seed, context, settings)
+            if len(result) == 3:
+                result = [*result, duration]  # Saved before simulated time was recorded
+            self.entries[key] = tuple(result)
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            data = {"entries": [[config, duration, seed, context, settings, result]
+                                for (config, duration, seed, context, settings), result in self.entries.items()]}
+        # Write to a temp file and swap it in so a crash never leaves a torn cache
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
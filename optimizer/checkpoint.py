@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import numpy as np
+from simulation.snapshot import CAR_COLUMNS, GridSnapshot
+
+# Bumped whenever the layout below changes; older files are refused rather than misread
+CHECKPOINT_VERSION = 1
+
+# Live-grid statistics that Grid.restore() zeroes for forks but a resume keeps
+GRID_STATS = ("total_wait_time", "cars_processed", "avg_wait_time", "elapsed_time", "gridlock_timer")
+
+
+def pack_rng(state):
+    # random.Random.getstate() -> (internal words as an array, JSON-safe rest)
+    version, internal, gauss_next = state
+    return np.array(internal, dtype=np.uint32), [version, gauss_next]
+
+
+def unpack_rng(words, rest):
+    version, gauss_next = rest
+    return version, tuple(int(w) for w in words), gauss_next
+
+
+def capture_checkpoint(controller):
+    """Copy everything needed to resume `controller` and its live grid.
+
+    Cheap enough for the render thread: a grid snapshot, a few small arrays and
+    the controller's state as JSON. Compression and disk I/O are left to
+    write_checkpoint, which a CheckpointWriter runs in the background.
+    """
+    grid = controller.grid
+    snapshot = grid.snapshot()
+    controller_words, controller_rng = pack_rng(controller.rng.getstate())
+    grid_words, grid_rng = pack_rng(snapshot.rng_state)
+    meta = {
+        "version": CHECKPOINT_VERSION,
+        "rows": grid.rows,
+        "cols": grid.cols,
+        "controller": controller.checkpoint_state(),
+        "controller_rng": controller_rng,
+        "grid_rng": grid_rng,
+        "grid_stats": {name: getattr(grid, name) for name in GRID_STATS},
+        "phases": snapshot.phases,
+        "spawn_timer": snapshot.spawn_timer,
+        "heat_timer": snapshot.heat_timer,
+    }
+    arrays = {f"car_{name}": column for name, column in snapshot.cars.items()}
+    arrays.update(
+        meta=np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8),
+        controller_rng=controller_words,
+        grid_rng=grid_words,
+        elapsed=np.array(snapshot.elapsed, dtype=np.float64),
+        congestion_heat=np.array(snapshot.congestion_heat, dtype=np.float64),
+    )
+    return arrays
+
+
+def write_checkpoint(path, arrays):
+    # Write to a temp file and swap it in so a crash never leaves a torn checkpoint
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path):
+    """Load a checkpoint as (meta, GridSnapshot, controller RNG state)."""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(data["meta"].tobytes().decode())
+        if meta.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {meta.get('version')!r} in {path}")
+        snapshot = GridSnapshot(
+            cars={name: data[f"car_{name}"] for name in CAR_COLUMNS},
+            phases=tuple(meta["phases"]),
+            elapsed=tuple(data["elapsed"].tolist()),
+            congestion_heat=tuple(data["congestion_heat"].tolist()),
+            spawn_timer=meta["spawn_timer"],
+            heat_timer=meta["heat_timer"],
+            rng_state=unpack_rng(data["grid_rng"], meta["grid_rng"]),
+        )
+        controller_rng = unpack_rng(data["controller_rng"], meta["controller_rng"])
+    return meta, snapshot, controller_rng
+
+
+def restore_checkpoint(path, controller):
+    """Resume `controller` and its live grid from the checkpoint at `path`."""
+    meta, snapshot, controller_rng = read_checkpoint(path)
+    grid = controller.grid
+    if (meta["rows"], meta["cols"]) != (grid.rows, grid.cols):
+        raise ValueError(f"Checkpoint is for a {meta['rows']}x{meta['cols']} grid, "
+                         f"not {grid.rows}x{grid.cols}")
+
+    controller.load_checkpoint_state(meta["controller"])
+    controller.rng.setstate(controller_rng)
+
+    grid.restore(snapshot)
+    for name, value in meta["grid_stats"].items():
+        setattr(grid, name, value)
+    for inter, cfg in zip(grid.intersections, controller.current_config):
+        inter.ns_duration = cfg["ns_duration"]
+        inter.ew_duration = cfg["ew_duration"]
+
+
+class CheckpointWriter:
+    """Writes checkpoints to one path from a background thread.
+
+    submit() only queues the captured arrays, so the render loop never waits on
+    compression or the disk. If a write is still running when the next
+    checkpoint arrives, only the newest queued one is written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.writes = 0
+
+    def submit(self, arrays):
+        with self.lock:
+            self.pending = arrays
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.drain, daemon=True)
+                self.thread.start()
+
+    def drain(self):
+        while True:
+            with self.lock:
+                arrays, self.pending = self.pending, None
+                if arrays is None:
+                    self.thread = None
+                    return
+            write_checkpoint(self.path, arrays)
+            self.writes += 1
+
+    def flush(self):
+        # Wait for queued checkpoints to reach the disk (at shutdown)
+        thread = self.thread
+        if thread is not None:
+            thread.join()
@@ -1,9 +1,17 @@
 import math
 import random
 import threading
-import pygame
-from optimizer.simulator import Simulator
-from simulation.grid import GRID_ROWS, GRID_COLS, Grid
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from optimizer.simulator import Simulator, evaluate_config, is_gridlocked
+from optimizer.cache import EvaluationCache, config_key
+from optimizer.stopping import SequentialStop
+from optimizer.halving import SuccessiveHalving
+from optimizer.surrogate import Surrogate
+from optimizer.checkpoint import CheckpointWriter, capture_checkpoint, restore_checkpoint
+from simulation.profiling import PhaseTimer
+from simulation.grid import Grid
 
 class AnnealingController:
     STATUS_INIT = "Evaluating initial config..."
@@ -14,12 +22,98 @@ class AnnealingController:
     STATUS_BEST_APPLIED = "Better config found!"
     STATUS_WAITING = "Waiting for next sim"
     STATUS_EVALUATING = "Evaluating new config..."
-
-    def __init__(self, grid, run_interval=10, T_start=150, T_min=1, alpha=0.95):
+    STATUS_RESUMED = "Resumed from checkpoint"
+
+    def __init__(self, grid, run_interval=10, T_start=150, T_min=1, alpha=0.95, workers=1, batch_size=None, engine="object",
+                 cache_size=1024, cache_path=None, seed=None, common_random_numbers=False,
+                 min_duration=20, max_duration=90, warm_start=False, gridlock_timeout=10.0, early_stopping=False,
+                 profile=False, tiles=(2, 2), checkpoint_path=None, checkpoint_interval=60.0, resume_from=None,
+                 successive_halving=False, halving_candidates=8, halving_eta=2, screen_duration=15,
+                 surrogate=False, surrogate_candidates=32):
         self.grid = grid
+
+        # Seeded runs draw mutations, acceptance and simulation seeds from one stream.
+        # With common random numbers every evaluation replays the same traffic, so
+        # candidate and incumbent differ only by their signal timings.
+        self.seed = seed
+        self.rng = random.Random(seed) if seed is not None else random
+        self.common_random_numbers = common_random_numbers
+        self.crn_seed = self.rng.getrandbits(32) if common_random_numbers else None
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        # Evaluations stop once the grid has been jammed this long (None = always run to the end)
+        self.gridlock_timeout = gridlock_timeout
+
+        # With early stopping, each candidate's Metropolis uniform is drawn before it
+        # is simulated, turning the acceptance test into a fitness bound the run can
+        # stop at as soon as the candidate is clearly on one side of it
+        self.early_stopping = early_stopping
+        self.acceptance_draws = None
+        self.early_stops = 0
+        self.evaluations = 0  # Configs actually simulated (cache hits excluded)
+        self.sim_seconds = 0.0  # Simulated seconds those evaluations were scheduled for
+
+        # With successive halving, each step screens `halving_candidates` mutations on
+        # `screen_duration`-second runs and promotes the best 1/`halving_eta` to longer
+        # ones, so only a few survivors are simulated at full length
+        if successive_halving and early_stopping:
+            raise ValueError("Successive halving screens candidates itself; it can't be combined with early stopping")
+        self.halving = SuccessiveHalving(halving_candidates, halving_eta, screen_duration) if successive_halving else None
+        self.screened = 0  # Candidates screened, and how many survived to full length
+        self.promoted = 0
+        self.full_fidelity_seconds = 0.0  # What simulating every screened candidate at full length would have cost
+
+        # With a surrogate, a regression trained on past results scores
+        # `surrogate_candidates` mutations and only the best-predicted are simulated.
+        # Predictions are kept until their results come back to track its error.
+        self.surrogate = Surrogate(grid.rows * grid.cols) if surrogate else None
+        self.surrogate_candidates = surrogate_candidates
+        self.surrogate_predictions = {}
+        self.surrogate_skipped = 0  # Mutations the surrogate ruled out without a simulation
+
+        # Where evaluation time goes: snapshot, cache and pool overhead plus, for
+        # single-worker runs, every phase of the simulated ticks
+        self.profiler = PhaseTimer() if profile else None
+
         self.eval_thread = None
         self.pending_first_eval = True
-        self.sim = Simulator()
+        self.engine = engine
+        # Candidates are simulated on a grid the size of the live one
+        self.sim = Simulator(engine, rows=grid.rows, cols=grid.cols, tiles=tiles)
+
+        # Parallel neighbor evaluation: `batch_size` mutations per temperature step,
+        # simulated across `workers` processes (spawned, so they don't inherit the window)
+        if batch_size is not None and batch_size > 1 and workers <= 1:
+            # Batches are only simulated across the pool; one worker evaluates one mutation at a time
+            raise ValueError("batch_size > 1 needs workers > 1")
+        self.workers = workers
+        self.batch_size = batch_size or workers
+        self.pool = None
+        if workers > 1:
+            if engine == "partitioned":
+                # It already runs a process per tile, and pool workers can't start processes
+                raise ValueError("The partitioned engine runs one evaluation at a time; use workers=1")
+            self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+        # With warm starts, candidates fork from a snapshot of the incumbent's settled
+        # traffic instead of filling an empty grid; rebuilt whenever the incumbent moves
+        if warm_start:
+            self.sim.check_warm_start()
+        self.warm_start = warm_start
+        self.snapshot = None
+        self.snapshot_key = None
+
+        # Every `checkpoint_interval` wall seconds, the optimizer and live grid are
+        # captured and written to `checkpoint_path` off the render thread
+        self.checkpoint_writer = CheckpointWriter(checkpoint_path) if checkpoint_path else None
+        self.checkpoint_interval = checkpoint_interval
+        self.last_checkpoint = time.monotonic()
+
+        # Results of configs we've already simulated (optionally persisted to disk). Early-stopped
+        # estimates are never stored, so only the settings of full runs go in the key.
+        cache_settings = {**self.sim.settings(), "gridlock_timeout": gridlock_timeout}
+        self.cache = EvaluationCache(cache_size, cache_path, cache_settings) if cache_size > 0 else None
+
         self.T = T_start
         self.T_min = T_min
         self.alpha = alpha
@@ -29,7 +123,7 @@ class AnnealingController:
         self.show_heatmap = True
 
 
-        num_intersections = GRID_ROWS * GRID_COLS
+        num_intersections = grid.rows * grid.cols
         self.current_config = [
             {"ns_duration": 10, "ew_duration": 3} if i % 2 == 0 else {"ns_duration": 3, "ew_duration": 10}
             for i in range(num_intersections)
@@ -49,8 +143,21 @@ class AnnealingController:
         self.max_cars_processed = 0
 
         self.pending_result = None
-        self.eval_thread = threading.Thread(target=self.evaluate_and_cleanup, args=(self.current_config,))
+        # Seconds each pending result actually simulated (less than asked for when a run
+        # stopped early or locked up), in the same order; set before pending_result
+        self.pending_durations = None
+        if resume_from is not None:
+            # Pick up where the checkpointed run left off; its incumbent is already scored
+            restore_checkpoint(resume_from, self)
+            self.pending_first_eval = False
+            if not self.optimization_locked:
+                self.status_message = self.STATUS_RESUMED
+            print(f"Resumed from {resume_from} at T={self.T:.2f}")
+            return
+
+        self.eval_thread = threading.Thread(target=self.evaluate_and_cleanup, args=(self.current_config, self.next_eval_seed()))
         self.eval_thread.start()
+        self.pending_first_eval = False  # Queued just now; update() mustn't start it a second time
 
         self.status_message = self.STATUS_INIT
 
@@ -60,33 +167,200 @@ class AnnealingController:
 
         new_config = [cfg.copy() for cfg in config_list]
 
-        num_to_mutate = random.randint(1, 2)
+        num_to_mutate = self.rng.randint(1, 2)
         for _ in range(num_to_mutate):
-            i = random.randint(0, len(new_config) - 1)
-            new_config[i]["ns_duration"] += random.choice([-1, 1])
-            new_config[i]["ew_duration"] += random.choice([-1, 1])
+            i = self.rng.randint(0, len(new_config) - 1)
+            new_config[i]["ns_duration"] += self.rng.choice([-1, 1])
+            new_config[i]["ew_duration"] += self.rng.choice([-1, 1])
             new_config[i]["ns_duration"] = clamp(new_config[i]["ns_duration"], 3, 10)
             new_config[i]["ew_duration"] = clamp(new_config[i]["ew_duration"], 3, 10)
 
         return new_config
 
-    def evaluate_in_background(self, new_config):
+    def next_eval_seed(self):
+        # Simulation seed for the next evaluation (None = unseeded, as before)
+        if self.common_random_numbers:
+            return self.crn_seed
+        if self.seed is None:
+            return None
+        return self.rng.getrandbits(32)
+
+    def warm_start_snapshot(self):
+        # (snapshot, cache context) for the current incumbent, or (None, None) without warm starts
+        if not self.warm_start:
+            return None, None
+        key = config_key(self.current_config)
+        if key != self.snapshot_key:
+            seed = self.crn_seed if self.common_random_numbers else self.seed
+            self.snapshot = self.sim.warm_start(self.current_config, seed=seed)
+            self.snapshot_key = key
+        return self.snapshot, f"warm:{self.snapshot_key}"
+
+    def stopping_rule(self, draw, duration):
+        # Metropolis accepts iff delta < -T ln(u), i.e. iff fitness < incumbent - T ln(u).
+        # Fitness swings while the grid fills, so don't judge the first half of the measured run (after warmup).
+        if draw is None:
+            return None
+        return SequentialStop(self.current_fitness - self.T * math.log(draw), min_time=duration / 2)
+
+    def evaluate_in_background(self, new_config, seed=None, draw=None):
         duration = self.get_dynamic_duration()
         print(f"⏱ Sim duration: {duration}s at T={self.T:.2f}")
         import time
         start = time.time()
-        fitness, throughput, cars_processed = self.sim.run(new_config, duration=duration, return_cars=True)
+        prof = self.profiler
+        if prof is not None:
+            eval_start = lap = prof.start()
+        snapshot, context = self.warm_start_snapshot()
+        if prof is not None:
+            lap = prof.lap("warm_start", lap)
+        cached = self.cache.get(new_config, duration, seed, context) if self.cache is not None else None
+        if prof is not None:
+            lap = prof.lap("cache", lap)
+        if cached:
+            fitness, throughput, cars_processed, simulated = cached
+            print("[Cache hit] Skipping simulation")
+        else:
+            stopping = self.stopping_rule(draw, duration)
+            fitness, throughput, cars_processed = self.sim.run(new_config, duration=duration, return_cars=True,
+                                                               seed=seed, warm_start=snapshot,
+                                                               gridlock_timeout=self.gridlock_timeout,
+                                                               stopping=stopping, profiler=prof)
+            simulated = self.sim.simulated
+            self.evaluations += 1
+            self.sim_seconds += duration
+            if stopping is not None and stopping.decision:
+                # Only an estimate; keep it out of the cache
+                self.early_stops += 1
+            else:
+                self.store_results([(new_config, fitness, throughput, cars_processed)], duration, [seed], context,
+                                   [simulated])
+        if prof is not None:
+            prof.lap("evaluation", eval_start)
+        print(f"[Eval Done] Real time: {time.time() - start:.3f}s")
+        self.pending_durations = [simulated]
+        self.pending_result = [(new_config, fitness, throughput, cars_processed)]
+
+    def evaluate_batch_in_background(self, configs, seeds, draws=None):
+        duration = self.get_dynamic_duration()
+        print(f"⏱ Sim duration: {duration}s at T={self.T:.2f} ({len(configs)} configs on {self.workers} workers)")
+        import time
+        start = time.time()
+        prof = self.profiler
+        if prof is not None:
+            eval_start = lap = prof.start()
+        snapshot, context = self.warm_start_snapshot()
+        if prof is not None:
+            lap = prof.lap("warm_start", lap)
+        cached = [self.cache.get(cfg, duration, seed, context) if self.cache is not None else None
+                  for cfg, seed in zip(configs, seeds)]
+        if prof is not None:
+            lap = prof.lap("cache", lap)
+        draws = draws or [None] * len(configs)
+        futures = [
+            None if hit else self.pool.submit(evaluate_config, cfg, duration, self.sim.settings(), seed, snapshot,
+                                              self.gridlock_timeout, self.stopping_rule(draw, duration))
+            for cfg, seed, hit, draw in zip(configs, seeds, cached, draws)
+        ]
+        results, stopped, simulated = [], [], []
+        for cfg, hit, future in zip(configs, cached, futures):
+            result = hit or future.result()
+            # Worker results add the stopping rule's decision; both end with the seconds simulated
+            stopped.append(not hit and result[3] is not None)
+            simulated.append(result[-1])
+            results.append((cfg, *result[:3]))
+        if prof is not None:
+            lap = prof.lap("pool_wait", lap)
+        self.early_stops += sum(stopped)
+        self.evaluations += sum(1 for hit in cached if not hit)
+        self.sim_seconds += duration * sum(1 for hit in cached if not hit)
+        # Early-stopped results are estimates; keep them out of the cache
+        misses = [i for i, hit in enumerate(cached) if not hit and not stopped[i]]
+        self.store_results([results[i] for i in misses], duration, [seeds[i] for i in misses], context,
+                           [simulated[i] for i in misses])
+        if prof is not None:
+            prof.lap("evaluation", eval_start)
         print(f"[Eval Done] Real time: {time.time() - start:.3f}s")
-        self.pending_result = (new_config, fitness, throughput, cars_processed)
+        self.pending_durations = simulated
+        self.pending_result = results
+
+    def simulate_configs(self, configs, seeds, duration, snapshot=None, context=None):
+        # Run every config for `duration` seconds (cache first, then the pool or this
+        # thread) and return (config, fitness, throughput, cars_processed) per config.
+        # The seconds each run actually simulated are left in `rung_durations`.
+        cached = [self.cache.get(cfg, duration, seed, context) if self.cache is not None else None
+                  for cfg, seed in zip(configs, seeds)]
+        if self.pool:
+            futures = [
+                None if hit else self.pool.submit(evaluate_config, cfg, duration, self.sim.settings(), seed, snapshot,
+                                                  self.gridlock_timeout)
+                for cfg, seed, hit in zip(configs, seeds, cached)
+            ]
+            runs = [hit or future.result() for hit, future in zip(cached, futures)]
+        else:
+            runs = []
+            for cfg, seed, hit in zip(configs, seeds, cached):
+                if not hit:
+                    hit = (*self.sim.run(cfg, duration=duration, return_cars=True, seed=seed, warm_start=snapshot,
+                                         gridlock_timeout=self.gridlock_timeout, profiler=self.profiler),
+                           self.sim.simulated)
+                runs.append(hit)
+        results = [(cfg, *run[:3]) for cfg, run in zip(configs, runs)]
+        self.rung_durations = [run[-1] for run in runs]
+        misses = [i for i, hit in enumerate(cached) if not hit]
+        self.evaluations += len(misses)
+        self.sim_seconds += duration * len(misses)
+        self.store_results([results[i] for i in misses], duration, [seeds[i] for i in misses], context,
+                           [self.rung_durations[i] for i in misses])
+        return results
+
+    def evaluate_halving_in_background(self, configs, seeds):
+        duration = self.get_dynamic_duration()
+        print(f"⏱ Screening {len(configs)} configs up to {duration}s at T={self.T:.2f}")
+        start = time.time()
+        prof = self.profiler
+        if prof is not None:
+            eval_start = lap = prof.start()
+        snapshot, context = self.warm_start_snapshot()
+        if prof is not None:
+            prof.lap("warm_start", lap)
+        results, rungs = self.halving.screen(
+            lambda rung_configs, rung_seeds, rung_duration: self.simulate_configs(rung_configs, rung_seeds, rung_duration,
+                                                                                 snapshot, context),
+            configs, seeds, duration)
+        self.screened += len(configs)
+        self.promoted += len(results)
+        self.full_fidelity_seconds += duration * len(configs)
+        if prof is not None:
+            prof.lap("evaluation", eval_start)
+        print(f"[Eval Done] Rungs {', '.join(f'{n}x{d}s' for n, d in rungs)} in {time.time() - start:.3f}s")
+        self.pending_durations = self.rung_durations  # The last rung run is the full-length one
+        self.pending_result = results
+
+    def store_results(self, results, duration, seeds, context=None, simulated=None):
+        if self.cache is None or not results:
+            return
+        simulated = simulated or [duration] * len(results)
+        for (cfg, fitness, throughput, cars_processed), seed, seconds in zip(results, seeds, simulated):
+            self.cache.put(cfg, duration, (fitness, throughput, cars_processed, seconds), seed, context)
+        self.cache.save()
 
     def get_dynamic_duration(self):
         temp = max(self.T_min, min(self.T, 100))
-        return int(20 + (90 - 20) * (1 - (temp - self.T_min) / (100 - self.T_min)))
+        span = self.max_duration - self.min_duration
+        return int(self.min_duration + span * (1 - (temp - self.T_min) / (100 - self.T_min)))
 
     def update(self, dt):
+        """Advance the optimizer by `dt` seconds.
+
+        When this call consumes a finished evaluation, it returns one flag per
+        result in pending_result order: True for the result that became the
+        incumbent. Otherwise it returns None.
+        """
+        self.tick_checkpoint()
         if getattr(self, "pending_first_eval", False):
             self.status_message = self.STATUS_EVALUATING
-            self.eval_thread = threading.Thread(target=self.evaluate_and_cleanup, args=(self.current_config,))
+            self.eval_thread = threading.Thread(target=self.evaluate_and_cleanup, args=(self.current_config, self.next_eval_seed()))
             self.eval_thread.start()
             self.pending_first_eval = False
             
@@ -96,39 +370,32 @@ class AnnealingController:
         self.timer += dt
 
         if self.T <= self.T_min and not self.eval_thread and not self.optimization_locked:
-            print("🌡️ Optimization complete — locking best config")
-            self.current_config = self.best_config
-            self.status_message = self.STATUS_OPTIMIZATION_DONE
-            self.optimization_locked = True 
-
-            for inter, cfg in zip(self.grid.intersections, self.best_config):
-                inter.ns_duration = cfg["ns_duration"]
-                inter.ew_duration = cfg["ew_duration"]
-                inter.elapsed = 0.0
-                inter.mark_updated()
-
-            self.grid.cars.clear()
-            self.grid.total_wait_time = 0.0
-            self.grid.cars_processed = 0
-            self.grid.avg_wait_time = 0.0
-            self.grid.elapsed_time = 0.0
-
-            self.prev_config = [cfg.copy() for cfg in self.current_config]
+            self.lock_best_config()
             return
 
         if self.pending_result:
-            new_config, new_fitness, new_throughput, cars_processed = self.pending_result
+            draws = self.acceptance_draws or [None] * len(self.pending_result)
+            kept = [(i, r, d) for i, (r, d) in enumerate(zip(self.pending_result, draws))
+                    if r[3] > 0 and not is_gridlocked(r[1:])]
+            results = [r for _, r, _ in kept]
+            draws = [d for _, _, d in kept]
+            taken = [False] * len(self.pending_result)
             self.pending_result = None
+            self.acceptance_draws = None
+            self.train_surrogate(results)
 
-            if cars_processed == 0:
+            if not results:
                 print("⚠️ Grid gridlock detected — rejecting mutation")
                 self.status_message = self.STATUS_REJECTED
                 self.timer = 0
-                return
+                return taken
 
             self.status_message = self.STATUS_APPLYING
 
             if self.current_fitness is None:
+                pick = min(range(len(results)), key=lambda k: results[k][1])
+                new_config, new_fitness, new_throughput, cars_processed = results[pick]
+                taken[kept[pick][0]] = True
                 self.current_fitness = new_fitness
                 self.best_fitness = new_fitness
                 self.best_throughput = new_throughput
@@ -141,7 +408,7 @@ class AnnealingController:
                     inter.elapsed = 0.0
                     inter.mark_updated()
 
-                self.grid.cars.clear()
+                self.grid.clear_cars()
                 self.grid.total_wait_time = 0.0
                 self.grid.cars_processed = 0
                 self.grid.avg_wait_time = 0.0
@@ -149,10 +416,15 @@ class AnnealingController:
                 self.status_message = self.STATUS_BEST_INITIALIZED
 
             else:
-                delta = new_fitness - self.current_fitness
-                accept_prob = math.exp(-delta / self.T) if delta > 0 else 1.0
-
-                if random.random() < accept_prob:
+                # Metropolis test every candidate against the incumbent; of those that
+                # pass, move to the fittest (a batch of one is plain annealing)
+                accepted = [k for k, (r, draw) in enumerate(zip(results, draws))
+                            if self.metropolis_accept(r[1] - self.current_fitness, draw)]
+                pick = min(accepted or range(len(results)), key=lambda k: results[k][1])
+                new_config, new_fitness, new_throughput, cars_processed = results[pick]
+
+                if accepted:
+                    taken[kept[pick][0]] = True
                     self.current_config = new_config
                     self.current_fitness = new_fitness
 
@@ -162,7 +434,7 @@ class AnnealingController:
                         self.best_throughput = new_throughput
                         print("🌟 New best fitness:", self.best_fitness)
 
-                        self.grid.cars.clear()
+                        self.grid.clear_cars()
                         self.grid.total_wait_time = 0.0
                         self.grid.cars_processed = 0
                         self.grid.avg_wait_time = 0.0
@@ -172,7 +444,7 @@ class AnnealingController:
                     print("❌ Rejected new config")
 
                 if self.status_message != self.STATUS_OPTIMIZATION_DONE:
-                    self.T *= self.alpha
+                    self.T *= self.alpha ** len(results)
 
 
             self.last_throughput = new_throughput
@@ -199,17 +471,149 @@ class AnnealingController:
             if self.status_message not in (self.STATUS_BEST_INITIALIZED, self.STATUS_BEST_APPLIED):
                 self.status_message = self.STATUS_WAITING
             self.timer = 0
+            return taken
 
         elif self.timer >= self.interval and not self.eval_thread:
             self.status_message = self.STATUS_EVALUATING
-            new_config = self.mutate(self.current_config)
-            self.eval_thread = threading.Thread(target=self.evaluate_and_cleanup, args=(new_config,))
+            if self.halving is not None:
+                configs = self.propose(self.halving.candidates)
+                seeds = [self.next_eval_seed() for _ in configs]
+                self.eval_thread = threading.Thread(target=self.evaluate_halving_and_cleanup, args=(configs, seeds))
+            elif self.pool:
+                configs = self.propose(self.batch_size)
+                seeds = [self.next_eval_seed() for _ in configs]
+                self.acceptance_draws = self.draw_acceptance(len(configs))
+                self.eval_thread = threading.Thread(target=self.evaluate_batch_and_cleanup,
+                                                    args=(configs, seeds, self.acceptance_draws))
+            else:
+                new_config, = self.propose(1)
+                seed = self.next_eval_seed()
+                self.acceptance_draws = self.draw_acceptance(1)
+                draw = self.acceptance_draws[0] if self.acceptance_draws else None
+                self.eval_thread = threading.Thread(target=self.evaluate_and_cleanup, args=(new_config, seed, draw))
             self.eval_thread.start()
 
-    def evaluate_and_cleanup(self, new_config):
-        self.evaluate_in_background(new_config)
+    def propose(self, count):
+        # `count` mutations of the incumbent; once the surrogate is trained, the
+        # best-predicted `count` of `surrogate_candidates` mutations
+        if self.surrogate is None or not self.surrogate.ready:
+            return [self.mutate(self.current_config) for _ in range(count)]
+        candidates = [self.mutate(self.current_config) for _ in range(max(count, self.surrogate_candidates))]
+        predicted = self.surrogate.predict(candidates, self.get_dynamic_duration()).tolist()
+        ranked = sorted(range(len(candidates)), key=predicted.__getitem__)[:count]
+        self.surrogate_skipped += len(candidates) - count
+        for i in ranked:
+            self.surrogate_predictions[config_key(candidates[i])] = predicted[i]
+        return [candidates[i] for i in ranked]
+
+    def train_surrogate(self, results):
+        # Score the predictions made for these results, then learn from them. Only
+        # results that got cars through without gridlocking; the duration is still
+        # the one they were simulated for, as the schedule hasn't moved yet.
+        if self.surrogate is None:
+            return
+        duration = self.get_dynamic_duration()
+        for config, fitness, _, _ in results:
+            predicted = self.surrogate_predictions.get(config_key(config))
+            if predicted is not None:
+                self.surrogate.record_error(predicted, fitness)
+        self.surrogate_predictions = {}
+        if results:
+            self.surrogate.observe([r[0] for r in results], duration, [r[1] for r in results])
+
+    def lock_best_config(self):
+        print("🌡️ Optimization complete — locking best config")
+        self.current_config = self.best_config
+        self.status_message = self.STATUS_OPTIMIZATION_DONE
+        self.optimization_locked = True 
+
+        for inter, cfg in zip(self.grid.intersections, self.best_config):
+            inter.ns_duration = cfg["ns_duration"]
+            inter.ew_duration = cfg["ew_duration"]
+            inter.elapsed = 0.0
+            inter.mark_updated()
+
+        self.grid.clear_cars()
+        self.grid.total_wait_time = 0.0
+        self.grid.cars_processed = 0
+        self.grid.avg_wait_time = 0.0
+        self.grid.elapsed_time = 0.0
+
+        self.prev_config = [cfg.copy() for cfg in self.current_config]
+
+    def metropolis_accept(self, delta, draw=None, T=None):
+        # `draw` is a uniform in (0, 1] drawn in advance for early stopping; otherwise draw one now.
+        # `T` overrides the annealing temperature (parallel tempering tests each chain at its own).
+        accept_prob = math.exp(-delta / (T or self.T)) if delta > 0 else 1.0
+        if draw is not None:
+            return draw <= accept_prob
+        return self.rng.random() < accept_prob
+
+    def draw_acceptance(self, count):
+        # Pre-drawn Metropolis uniforms in (0, 1], or None when candidates run to the end
+        if not self.early_stopping or self.current_fitness is None:
+            return None
+        return [1.0 - self.rng.random() for _ in range(count)]
+
+    def evaluate_and_cleanup(self, new_config, seed=None, draw=None):
+        self.evaluate_in_background(new_config, seed, draw)
+        self.eval_thread = None
+
+    def evaluate_batch_and_cleanup(self, configs, seeds, draws=None):
+        self.evaluate_batch_in_background(configs, seeds, draws)
+        self.eval_thread = None
+
+    def evaluate_halving_and_cleanup(self, configs, seeds):
+        self.evaluate_halving_in_background(configs, seeds)
         self.eval_thread = None
 
+    def checkpoint_state(self):
+        # JSON-safe optimizer state for a checkpoint (RNG state is saved separately)
+        return {
+            "T": self.T,
+            "current_config": self.current_config,
+            "current_fitness": self.current_fitness,
+            "best_config": self.best_config,
+            "best_fitness": self.best_fitness,
+            "best_throughput": self.best_throughput,
+            "last_throughput": self.last_throughput,
+            "fitness_history": self.fitness_history,
+            "last_cars_processed": self.last_cars_processed,
+            "max_cars_processed": self.max_cars_processed,
+            "crn_seed": self.crn_seed,
+            "early_stops": self.early_stops,
+            "evaluations": self.evaluations,
+            "sim_seconds": self.sim_seconds,
+            "screened": self.screened,
+            "promoted": self.promoted,
+            "full_fidelity_seconds": self.full_fidelity_seconds,
+            "optimization_locked": self.optimization_locked,
+        }
+
+    def load_checkpoint_state(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self.prev_config = [cfg.copy() for cfg in self.current_config]
+        if self.optimization_locked:
+            self.status_message = self.STATUS_OPTIMIZATION_DONE
+
+    def save_checkpoint(self):
+        if self.checkpoint_writer is not None:
+            self.checkpoint_writer.submit(capture_checkpoint(self))
+            self.last_checkpoint = time.monotonic()
+
+    def tick_checkpoint(self):
+        if self.checkpoint_writer is not None and time.monotonic() - self.last_checkpoint >= self.checkpoint_interval:
+            self.save_checkpoint()
+
+    def shutdown(self):
+        if self.checkpoint_writer is not None:
+            self.save_checkpoint()
+            self.checkpoint_writer.flush()
+        if self.pool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
     def get_debug_info(self):
         return {
             "best_fitness": self.best_fitness if self.best_fitness is not None else 0.0,
@@ -222,6 +626,20 @@ class AnnealingController:
             "throughput": self.last_throughput,
             "cars_processed": self.last_cars_processed,
             "max_cars": self.max_cars_processed,
+            "workers": self.workers,
+            "cache_hits": self.cache.hits if self.cache is not None else 0,
+            "cache_misses": self.cache.misses if self.cache is not None else 0,
+            "early_stops": self.early_stops,
+            "evaluations": self.evaluations,
+            "budget": {
+                "sim_seconds": self.sim_seconds,
+                "screened": self.screened,
+                "promoted": self.promoted,
+                "full_fidelity_seconds": self.full_fidelity_seconds,
+            },
+            "surrogate": {**self.surrogate.summary(), "skipped": self.surrogate_skipped} if self.surrogate is not None else {},
+            "profile": self.profiler.summary() if self.profiler is not None else {},
+            "grid_profile": self.grid.profiler.summary() if self.grid.profiler is not None else {},
             "cars_in_grid": len(self.grid.cars),
             "avg_stopped_time": sum(c.stopped_time for c in self.grid.cars) / len(self.grid.cars) if self.grid.cars else 0.0,
 
@@ -0,0 +1,48 @@
+from optimizer.simulator import is_gridlocked
+
+
+class SuccessiveHalving:
+    """Multi-fidelity screening of a batch of candidates.
+
+    Every candidate first gets a cheap `min_duration`-second run. The best
+    1/`eta` of them (by fitness, gridlocked runs last) are promoted to a run `eta`
+    times longer, and so on until the survivors are run at `full_duration`, the
+    fidelity the incumbent was scored at. A lone survivor goes straight to full
+    fidelity. Only full-fidelity results are returned, so the Metropolis test
+    never compares a short run's fitness against a long one.
+
+    Each candidate keeps its seed at every rung, so a promoted run replays the
+    traffic it was screened on for longer. `evaluate(configs, seeds, duration)`
+    simulates a rung and returns (config, fitness, throughput, cars_processed)
+    tuples; the controller supplies one that uses its cache and worker pool.
+    """
+
+    def __init__(self, candidates=8, eta=2, min_duration=15):
+        if eta < 2:
+            raise ValueError("Successive halving needs eta >= 2")
+        self.candidates = candidates
+        self.eta = eta
+        self.min_duration = min_duration
+
+    def screen(self, evaluate, configs, seeds, full_duration):
+        """Run the rungs; return (full-fidelity results, [(candidates, duration), ...] as run)."""
+        entries = list(zip(configs, seeds))
+        duration = min(self.min_duration, full_duration)
+        history = []
+        while True:
+            results = evaluate([c for c, _ in entries], [s for _, s in entries], duration)
+            history.append((len(entries), duration))
+            if duration >= full_duration:
+                return results, history
+            ranked = sorted(range(len(results)), key=lambda i: screening_key(results[i]))
+            keep = max(1, len(entries) // self.eta)
+            entries = [entries[i] for i in ranked[:keep]]
+            duration = full_duration if keep == 1 else min(full_duration, duration * self.eta)
+
+
+def screening_key(result):
+    # Lower fitness is better; only runs aborted on gridlock are demoted. A short
+    # rung often ends before any car has crossed the grid, which says nothing
+    # against a config, so cars_processed plays no part.
+    _, fitness, throughput, _ = result
+    return (is_gridlocked((fitness, throughput)), fitness)
@@ -1,39 +1,248 @@
-import pygame
+import json
+import math
 import random
-from simulation.grid import Grid
+import numpy as np
+from simulation.grid import Grid, GRID_ROWS, GRID_COLS, THROUGHPUT_WEIGHT
+from simulation.array_grid import ArrayGrid
+from simulation.batch_grid import BatchGrid
+from simulation.partition import PartitionedGrid
+
+# Simulation engines selectable for headless evaluation
+ENGINES = {
+    "object": Grid,      # One Car object per vehicle
+    "array": ArrayGrid,  # NumPy structure-of-arrays, vectorized per tick
+    "partitioned": PartitionedGrid,  # Tiles of Grid stepped in parallel processes, for large grids
+}
+
+# Fitness reported for a run aborted because the grid locked up; no finite
+# incumbent can lose to it, so the Metropolis test always rejects it
+GRIDLOCK_FITNESS = math.inf
+
+
+def is_gridlocked(result):
+    """True for a (fitness, throughput, ...) result flagged as gridlocked."""
+    return result[0] == GRIDLOCK_FITNESS
+
+
+def projected_fitness(grid, total_time):
+    """Estimate the fitness `grid` will report after `total_time` simulated seconds.
+
+    Every term but throughput describes the current state of traffic; the throughput
+    reward grows with the run, so its share is extrapolated at the rate seen so far.
+    """
+    if grid.elapsed_time <= 0:
+        return grid.fitness
+    remaining = total_time / grid.elapsed_time - 1.0
+    return grid.fitness - THROUGHPUT_WEIGHT * grid.cars_processed * remaining
+
 
 class Simulator:
-    def __init__(self):
-        pygame.init()
-        pass
+    def __init__(self, engine="object", max_cars=None, spawn_interval=None, rows=GRID_ROWS, cols=GRID_COLS,
+                 tiles=(2, 2)):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown simulation engine: {engine!r}")
+        self.engine = engine
+        self.rows = rows
+        self.cols = cols
+        self.tiles = tiles  # (tile rows, tile cols) for the partitioned engine
+        # Traffic overrides for run() and warm_start() grids (None = the grid's default)
+        self.max_cars = max_cars
+        self.spawn_interval = spawn_interval
+        # Seconds the last run() actually measured: its duration, or less if it stopped early
+        self.simulated = None
+
+    def settings(self):
+        """What a run's result depends on besides its config, duration and seed."""
+        settings = {"engine": self.engine, "rows": self.rows, "cols": self.cols,
+                    "max_cars": self.max_cars, "spawn_interval": self.spawn_interval}
+        if self.engine == "partitioned":
+            settings["tiles"] = list(self.tiles)  # Tile seams change the (approximate) results
+        return settings
 
-    def run(self, config, duration=30, return_cars=False):
-        grid = Grid(headless=True)
+    @classmethod
+    def from_settings(cls, settings):
+        """A Simulator with the given settings() (as passed to pool workers)."""
+        settings = dict(settings)
+        if "tiles" in settings:
+            settings["tiles"] = tuple(settings["tiles"])
+        return cls(**settings)
+
+    def check_warm_start(self):
+        # Tile processes keep their cars to themselves, so partitioned grids have no snapshots
+        if self.engine == "partitioned":
+            raise ValueError("The partitioned engine can't snapshot its grid, so it can't warm start")
+
+    def make_grid(self, seed=None):
+        if self.engine == "partitioned":
+            grid = PartitionedGrid(headless=True, seed=seed, rows=self.rows, cols=self.cols, tiles=self.tiles)
+        else:
+            grid = ENGINES[self.engine](headless=True, seed=seed, rows=self.rows, cols=self.cols)
+        if self.max_cars is not None:
+            grid.max_cars = self.max_cars
+        if self.spawn_interval is not None:
+            grid.spawn_interval = self.spawn_interval
+        return grid
+
+    def run(self, config, duration=30, return_cars=False, seed=None, warm_start=None, gridlock_timeout=None,
+            stopping=None, profiler=None, recorder=None):
+        """Simulate `config` headless and return (fitness, throughput[, cars_processed]).
+
+        With `gridlock_timeout`, the run stops as soon as the grid has been full for
+        that many seconds without a car leaving, and reports GRIDLOCK_FITNESS with
+        throughput over the time simulated until then.
+
+        With a `stopping` rule (see optimizer.stopping), the run ends as soon as the
+        rule has decided which side of its bound the fitness falls on; the reported
+        fitness is then the rule's estimate and throughput covers the time simulated.
+
+        A `profiler` (simulation.profiling.PhaseTimer) is charged with grid setup,
+        the whole run, and every phase of every tick. A `recorder`
+        (simulation.trace.TraceRecorder) is fed every tick; the caller closes it.
+        """
+        if warm_start is not None:
+            self.check_warm_start()
+        if profiler is not None:
+            run_start = profiler.start()
+        grid = self.make_grid(seed)
+        grid.profiler = profiler
+        grid.recorder = recorder
+
+        if warm_start is not None:
+            # Fork from already-settled traffic; only the timings below are ours
+            grid.restore(warm_start)
+            if seed is not None:
+                grid.rng = random.Random(seed)
+            warmup = 0.0
+        else:
+            warmup = 5.0  # Let traffic settle
 
         # Apply config to each intersection
         for inter, cfg in zip(grid.intersections, config):
             inter.ns_duration = cfg["ns_duration"]
             inter.ew_duration = cfg["ew_duration"]
-            inter.elapsed = random.uniform(0, 3)  # Desync light timers
+            if warm_start is None:
+                inter.elapsed = grid.rng.uniform(0, 3)  # Desync light timers
 
-        warmup = 5.0  # Let traffic settle
         total_sim_time = duration + warmup
+        if profiler is not None:
+            profiler.lap("run_setup", run_start)
 
         # Fixed timestep (simulate at 60 FPS)
         dt = 1.0 / 30.0
         steps = int(total_sim_time / dt)
 
-        for _ in range(steps):
-            grid.update_only(dt)
+        fitness = None
+        try:
+            for step in range(steps):
+                grid.update_only(dt)
+                if gridlock_timeout is not None and grid.gridlock_timer >= gridlock_timeout:
+                    print(f"Gridlock after {grid.elapsed_time:.1f}s, aborting evaluation")
+                    fitness = GRIDLOCK_FITNESS
+                    # Throughput over the stretch of the run we actually simulated, as for early stops
+                    duration = max(dt, (step + 1) * dt - warmup)
+                    break
+                # The rule's clock starts after warmup, so its min_time is a share of the measured run
+                if stopping is not None and stopping.observe(grid.elapsed_time - warmup,
+                                                             projected_fitness(grid, total_sim_time)):
+                    print(f"Clearly {stopping.decision} than the bound after {grid.elapsed_time:.1f}s, stopping evaluation")
+                    fitness = stopping.estimate
+                    # Report throughput over the stretch of the run we actually simulated
+                    duration = max(dt, (step + 1) * dt - warmup)
+                    break
+        finally:
+            grid.close()
+        if fitness is None:
+            fitness = grid.fitness
+        if profiler is not None:
+            profiler.lap("run", run_start)
 
         # Only count stats from final `duration` seconds
+        self.simulated = duration
         if return_cars:
-            print(f"Evaluated config with fitness {grid.fitness:.2f} and {grid.cars_processed} cars processed in {duration:.1f}s")
+            print(f"Evaluated config with fitness {fitness:.2f} and {grid.cars_processed} cars processed in {duration:.1f}s")
 
-            return grid.fitness, (grid.cars_processed / duration) * 60, grid.cars_processed
+            return fitness, (grid.cars_processed / duration) * 60, grid.cars_processed
         else:
-            return grid.fitness, (grid.cars_processed / duration) * 60
+            return fitness, (grid.cars_processed / duration) * 60
+
+    def warm_start(self, config, warmup=20.0, seed=None):
+        """Run `config` from an empty grid for `warmup` seconds and snapshot the result.
+
+        Pass the snapshot as `warm_start` to run/run_batch to skip the warmup.
+        """
+        self.check_warm_start()
+        grid = self.make_grid(seed)
+        for inter, cfg in zip(grid.intersections, config):
+            inter.ns_duration = cfg["ns_duration"]
+            inter.ew_duration = cfg["ew_duration"]
+            inter.elapsed = grid.rng.uniform(0, 3)  # Desync light timers
+
+        dt = 1.0 / 30.0
+        try:
+            for _ in range(int(warmup / dt)):
+                grid.update_only(dt)
+            return grid.snapshot()
+        finally:
+            grid.close()
+
+    def run_batch(self, configs, duration=30, seeds=None, rngs=None, warm_start=None, gridlock_timeout=None):
+        """Simulate every config side by side in one BatchGrid.
+
+        Returns a list of (fitness, throughput, cars_processed), one per config.
+        With `seeds`, each entry matches run(config, duration, seed=seed). Members
+        that lock up are reported as run() would report them, and the batch stops
+        early once every member has.
+        """
+        batch = BatchGrid(configs, seeds=seeds, rngs=rngs, warm_start=warm_start, rows=self.rows, cols=self.cols,
+                          max_cars=self.max_cars, spawn_interval=self.spawn_interval)
+
+        warmup = 0.0 if warm_start is not None else 5.0  # Let traffic settle
+        total_sim_time = duration + warmup
+
+        dt = 1.0 / 30.0
+        steps = int(total_sim_time / dt)
+
+        gridlocked = np.zeros(batch.size, dtype=bool)
+        locked_processed = np.zeros(batch.size, dtype=np.int64)
+        durations = np.full(batch.size, float(duration))
+        for step in range(steps):
+            batch.update_only(dt)
+            if gridlock_timeout is not None:
+                newly = ~gridlocked & (batch.gridlock_timer >= gridlock_timeout)
+                locked_processed[newly] = batch.cars_processed[newly]
+                durations[newly] = max(dt, (step + 1) * dt - warmup)
+                gridlocked |= newly
+                if gridlocked.all():
+                    break
+
+        fitness = np.where(gridlocked, GRIDLOCK_FITNESS, batch.fitness)
+        processed = np.where(gridlocked, locked_processed, batch.cars_processed)
+        return [
+            (fitness, (cars_processed / simulated) * 60, cars_processed)
+            for fitness, cars_processed, simulated in zip(fitness.tolist(), processed.tolist(), durations.tolist())
+        ]
+
 
+# One Simulator per distinct settings in each evaluation worker process
+_worker_simulators = {}
 
+def evaluate_config(config, duration, settings=None, seed=None, warm_start=None, gridlock_timeout=None,
+                    stopping=None):
+    """Process-pool entry point: run one config and return
+    (fitness, throughput, cars_processed, decision, simulated).
 
+    `settings` is the parent Simulator's settings() (engine, grid size, traffic
+    overrides, tiles), so the worker simulates exactly what a serial run would.
 
+    The worker's copy of a `stopping` rule never makes it back, so its decision
+    (None without a rule, or if the run went the full length) is returned, along
+    with the seconds the run actually measured (see Simulator.simulated).
+    """
+    settings = settings or {}
+    key = json.dumps(settings, sort_keys=True)
+    sim = _worker_simulators.get(key)
+    if sim is None:
+        sim = _worker_simulators[key] = Simulator.from_settings(settings)
+    result = sim.run(config, duration=duration, return_cars=True, seed=seed, warm_start=warm_start,
+                     gridlock_timeout=gridlock_timeout, stopping=stopping)
+    return (*result, stopping.decision if stopping is not None else None, sim.simulated)
@@ -0,0 +1,59 @@
+import math
+from collections import deque
+
+
+class SequentialStop:
+    """Stopping rule that ends an evaluation once its outcome is no longer in doubt.
+
+    The annealer only needs to know which side of `bound` a candidate's fitness
+    lands on (the Metropolis threshold for a pre-drawn uniform). Simulator.run
+    feeds observe() the projected end-of-run fitness as the run progresses,
+    timed from the end of the warmup (samples taken during it are ignored); the
+    rule samples it every `interval` simulated seconds and, after `min_time`,
+    stops as soon as the last `window` samples put the final value more than `z`
+    prediction errors above the bound. The final fitness is a single noisy
+    reading, so the margin uses the spread of the samples rather than the error
+    of their mean, and `tolerance` keeps a flat stretch of signal from looking
+    certain.
+
+    Fitness tends to climb late in a run as stopped cars pile up, so a candidate
+    that looks clearly better halfway through often isn't. Stopping on "better"
+    is therefore opt-in via `decide_better`.
+
+    After a stop, `decision` is "worse" or "better" and `estimate` holds the
+    window mean, which is on the same side of the bound as the decision.
+    """
+
+    def __init__(self, bound, min_time=10.0, interval=1.0, window=10, z=2.0, tolerance=1.0, decide_better=False):
+        self.bound = bound
+        self.min_time = min_time
+        self.interval = interval
+        self.z = z
+        self.tolerance = tolerance
+        self.decide_better = decide_better
+        self.samples = deque(maxlen=window)
+        self.next_sample = 0.0
+        self.decision = None
+        self.estimate = None
+
+    def observe(self, elapsed, fitness):
+        """Record the projected fitness at `elapsed` seconds; True means stop now."""
+        if elapsed < self.next_sample:
+            return False
+        self.next_sample += self.interval
+        self.samples.append(fitness)
+        if elapsed < self.min_time or len(self.samples) < self.samples.maxlen:
+            return False
+
+        n = len(self.samples)
+        mean = sum(self.samples) / n
+        variance = sum((s - mean) ** 2 for s in self.samples) / (n - 1)
+        margin = max(self.z * math.sqrt(variance * (1 + 1 / n)), self.tolerance)
+        if mean - margin > self.bound:
+            self.decision = "worse"
+        elif self.decide_better and mean + margin < self.bound:
+            self.decision = "better"
+        else:
+            return False
+        self.estimate = mean
+        return True
@@ -0,0 +1,64 @@
+from collections import deque
+import numpy as np
+
+
+class Surrogate:
+    """Online ridge regression of fitness on signal timings.
+
+    Predicts a config's fitness from its ns/ew durations and the simulated
+    duration it would be run for. Sufficient statistics (XᵀX, Xᵀy) are
+    updated per observation, so fitting is one small solve whatever the history,
+    and the model keeps learning for the whole run. It's only trusted once it
+    has seen `min_samples` evaluations.
+
+    Prediction errors are recorded by the controller as simulated results come
+    back: `mae` covers the whole run, `recent_mae` the last `window` predictions.
+    """
+
+    def __init__(self, size, ridge=1.0, min_samples=10, window=20):
+        features = 2 + 2 * size  # Intercept, duration, then ns and ew per intersection
+        self.xtx = ridge * np.eye(features)
+        self.xty = np.zeros(features)
+        self.weights = None
+        self.min_samples = min_samples
+        self.samples = 0
+        self.errors = 0
+        self.error_total = 0.0
+        self.recent_errors = deque(maxlen=window)
+
+    @staticmethod
+    def features(configs, duration):
+        rows = np.array([[(cfg["ns_duration"], cfg["ew_duration"]) for cfg in config] for config in configs], dtype=float)
+        rows = rows.transpose(0, 2, 1).reshape(len(configs), -1)
+        leading = np.column_stack([np.ones(len(configs)), np.full(len(configs), float(duration))])
+        return np.hstack([leading, rows])
+
+    @property
+    def ready(self):
+        return self.samples >= self.min_samples
+
+    def observe(self, configs, duration, fitnesses):
+        x = self.features(configs, duration)
+        self.xtx += x.T @ x
+        self.xty += x.T @ np.asarray(fitnesses, dtype=float)
+        self.samples += len(configs)
+        self.weights = None
+
+    def predict(self, configs, duration):
+        if self.weights is None:
+            self.weights = np.linalg.solve(self.xtx, self.xty)
+        return self.features(configs, duration) @ self.weights
+
+    def record_error(self, predicted, actual):
+        error = abs(actual - predicted)
+        self.errors += 1
+        self.error_total += error
+        self.recent_errors.append(error)
+
+    def summary(self):
+        return {
+            "samples": self.samples,
+            "predictions_checked": self.errors,
+            "mae": self.error_total / self.errors if self.errors else 0.0,
+            "recent_mae": sum(self.recent_errors) / len(self.recent_errors) if self.recent_errors else 0.0,
+        }
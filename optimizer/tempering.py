@@ -0,0 +1,222 @@
+import math
+import threading
+from optimizer.controller import AnnealingController
+from optimizer.simulator import is_gridlocked
+
+
+class TemperingController(AnnealingController):
+    """Parallel tempering: several Metropolis chains at fixed temperatures.
+
+    Chains run on a geometric ladder from `T_cold` up to `T_start`. Every round
+    each chain proposes one mutation of its own config; the round's candidates are
+    simulated together (across the worker pool when `workers` > 1) and each chain
+    Metropolis-tests its candidate at its own temperature. Every `swap_interval`
+    rounds, neighbouring chains offer to exchange configs, so good timings found
+    by the hot, exploring chains drift down to the cold chain, and a cold chain
+    stuck in a poor optimum can be pulled back up. After `rounds` rounds the best
+    config seen is locked in, as AnnealingController does when it has cooled.
+
+    Drives and reports like AnnealingController: the live grid runs the cold
+    chain's config, `temperature` is the cold chain's, and get_debug_info adds the
+    chain ladder and swap statistics. Early stopping is not supported, as its
+    bound comes from a single incumbent.
+    """
+
+    def __init__(self, grid, chains=4, T_cold=2.0, T_start=150, rounds=100, swap_interval=1, **kwargs):
+        if kwargs.get("early_stopping"):
+            raise ValueError("Parallel tempering doesn't support early stopping")
+        if kwargs.get("successive_halving"):
+            raise ValueError("Parallel tempering doesn't support successive halving")
+        if kwargs.get("surrogate"):
+            raise ValueError("Parallel tempering doesn't support surrogate screening")
+        # Set up before the base class runs, which starts the initial evaluation (asking
+        # for a duration) or resumes a checkpoint that overwrites the chains
+        self.rounds = rounds
+        self.rounds_done = 0
+        self.temperatures = [
+            T_cold * (T_start / T_cold) ** (k / (chains - 1)) if chains > 1 else T_cold
+            for k in range(chains)
+        ]
+        self.swap_interval = swap_interval
+        self.chain_configs = [None] * chains
+        self.chain_fitness = [None] * chains
+        self.swap_attempts = [0] * (chains - 1)
+        self.swap_accepts = [0] * (chains - 1)
+        super().__init__(grid, T_start=T_start, **kwargs)
+        self.T = self.temperatures[0]
+
+    def get_dynamic_duration(self):
+        # Runs lengthen as the rounds go by, as they do while annealing cools
+        span = self.max_duration - self.min_duration
+        return int(self.min_duration + span * min(1.0, self.rounds_done / self.rounds))
+
+    def evaluate_round_in_background(self, configs, seeds):
+        if self.pool:
+            self.evaluate_batch_in_background(configs, seeds)
+        else:
+            # update() waits for eval_thread to clear, so it never sees a partial round
+            results, durations = [], []
+            for config, seed in zip(configs, seeds):
+                self.evaluate_in_background(config, seed)
+                results.extend(self.pending_result)
+                durations.extend(self.pending_durations)
+            self.pending_durations = durations
+            self.pending_result = results
+        self.eval_thread = None
+
+    def update(self, dt):
+        # Returns per-result flags as AnnealingController.update does; here True
+        # means the result's chain accepted it
+        self.tick_checkpoint()
+        if self.status_message == self.STATUS_OPTIMIZATION_DONE:
+            return
+
+        self.timer += dt
+
+        if self.rounds_done >= self.rounds and not self.eval_thread and not self.optimization_locked:
+            self.lock_best_config()
+            return
+
+        if self.pending_result and not self.eval_thread:
+            results = self.pending_result
+            self.pending_result = None
+            if self.current_fitness is None:
+                taken = self.start_chains(results)
+            else:
+                taken = self.advance_chains(results)
+            self.timer = 0
+            return taken
+
+        elif self.timer >= self.interval and not self.eval_thread:
+            self.status_message = self.STATUS_EVALUATING
+            if self.current_fitness is None:
+                # The initial config locked up; look for a workable starting point
+                configs = [self.mutate(self.current_config)]
+            else:
+                configs = [self.mutate(config) for config in self.chain_configs]
+            seeds = [self.next_eval_seed() for _ in configs]
+            self.eval_thread = threading.Thread(target=self.evaluate_round_in_background, args=(configs, seeds))
+            self.eval_thread.start()
+
+    def start_chains(self, results):
+        taken = [False] * len(results)
+        valid = [i for i, r in enumerate(results) if r[3] > 0 and not is_gridlocked(r[1:])]
+        if not valid:
+            print("⚠️ Grid gridlock detected — rejecting mutation")
+            self.status_message = self.STATUS_REJECTED
+            return taken
+
+        pick = min(valid, key=lambda i: results[i][1])
+        taken[pick] = True
+        config, fitness, throughput, cars_processed = results[pick]
+        self.chain_configs = [config] * len(self.temperatures)
+        self.chain_fitness = [fitness] * len(self.temperatures)
+        self.current_config = config
+        self.current_fitness = fitness
+        self.best_config = config
+        self.best_fitness = fitness
+        self.best_throughput = throughput
+        self.record_round(throughput, cars_processed)
+        self.apply_current_config()
+        self.reset_live_traffic()
+        self.status_message = self.STATUS_BEST_INITIALIZED
+        return taken
+
+    def advance_chains(self, results):
+        new_best = False
+        taken = [False] * len(results)
+        for k, (config, fitness, throughput, cars_processed) in enumerate(results):
+            if cars_processed <= 0 or is_gridlocked((fitness, throughput)):
+                continue
+            if self.metropolis_accept(fitness - self.chain_fitness[k], T=self.temperatures[k]):
+                taken[k] = True
+                self.chain_configs[k] = config
+                self.chain_fitness[k] = fitness
+                if fitness < self.best_fitness:
+                    self.best_config = config
+                    self.best_fitness = fitness
+                    self.best_throughput = throughput
+                    new_best = True
+
+        self.rounds_done += 1
+        if self.rounds_done % self.swap_interval == 0:
+            self.swap_chains()
+
+        self.current_config = self.chain_configs[0]
+        self.current_fitness = self.chain_fitness[0]
+        _, _, throughput, cars_processed = results[0]
+        self.record_round(throughput, cars_processed)
+        self.apply_current_config()
+
+        if new_best:
+            print("🌟 New best fitness:", self.best_fitness)
+            self.reset_live_traffic()
+            self.status_message = self.STATUS_BEST_APPLIED
+        else:
+            self.status_message = self.STATUS_WAITING
+        return taken
+
+    def swap_chains(self):
+        # Alternate between the even and odd neighbour pairs so each pair is offered
+        # a swap every other time. A swap that hands the colder chain the fitter
+        # config is always taken; the reverse with the usual replica-exchange odds.
+        first = (self.rounds_done // self.swap_interval) % 2
+        for i in range(first, len(self.temperatures) - 1, 2):
+            j = i + 1
+            self.swap_attempts[i] += 1
+            exponent = (self.chain_fitness[i] - self.chain_fitness[j]) * (1 / self.temperatures[i] - 1 / self.temperatures[j])
+            if exponent >= 0 or self.rng.random() < math.exp(exponent):
+                self.chain_configs[i], self.chain_configs[j] = self.chain_configs[j], self.chain_configs[i]
+                self.chain_fitness[i], self.chain_fitness[j] = self.chain_fitness[j], self.chain_fitness[i]
+                self.swap_accepts[i] += 1
+
+    def record_round(self, throughput, cars_processed):
+        self.last_throughput = throughput
+        self.last_cars_processed = cars_processed
+        self.max_cars_processed = max(self.max_cars_processed, cars_processed)
+
+        self.fitness_history.append(self.best_fitness)
+        if len(self.fitness_history) > 100:
+            self.fitness_history.pop(0)
+
+    def apply_current_config(self):
+        for inter, cfg, old_cfg in zip(self.grid.intersections, self.current_config, self.prev_config):
+            inter.ns_duration = cfg["ns_duration"]
+            inter.ew_duration = cfg["ew_duration"]
+            inter.elapsed = 0.0
+            if cfg != old_cfg:
+                inter.mark_updated()
+        self.prev_config = [cfg.copy() for cfg in self.current_config]
+
+    def reset_live_traffic(self):
+        self.grid.clear_cars()
+        self.grid.total_wait_time = 0.0
+        self.grid.cars_processed = 0
+        self.grid.avg_wait_time = 0.0
+
+    def checkpoint_state(self):
+        # A resume restores the checkpointed ladder along with its chains
+        state = super().checkpoint_state()
+        state.update({
+            "temperatures": self.temperatures,
+            "chain_configs": self.chain_configs,
+            "chain_fitness": self.chain_fitness,
+            "rounds_done": self.rounds_done,
+            "swap_attempts": self.swap_attempts,
+            "swap_accepts": self.swap_accepts,
+        })
+        return state
+
+    def get_debug_info(self):
+        info = super().get_debug_info()
+        attempts = sum(self.swap_attempts)
+        info.update({
+            "chains": [
+                {"temperature": T, "fitness": fitness if fitness is not None else 0.0}
+                for T, fitness in zip(self.temperatures, self.chain_fitness)
+            ],
+            "swap_rate": sum(self.swap_accepts) / attempts if attempts else 0.0,
+            "round": self.rounds_done,
+            "rounds": self.rounds,
+        })
+        return info
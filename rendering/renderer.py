@@ -0,0 +1,104 @@
+# rendering/renderer.py
+
+import pygame
+from simulation.car import CAR_WIDTH, CAR_LENGTH, CAR_COLOR
+from simulation.grid import ROAD_WIDTH
+
+
+def draw_car(screen, car):
+    if car.direction in ("N", "S"):
+        rect = pygame.Rect(car.x - CAR_WIDTH // 2, car.y - CAR_LENGTH // 2, CAR_WIDTH, CAR_LENGTH)
+    else:
+        rect = pygame.Rect(car.x - CAR_LENGTH // 2, car.y - CAR_WIDTH // 2, CAR_LENGTH, CAR_WIDTH)
+
+    pygame.draw.rect(screen, CAR_COLOR, rect)
+
+
+def draw_intersection_box(screen, inter):
+    pygame.draw.rect(screen, (150, 150, 150), (inter.cx - 20, inter.cy - 20, 40, 40))
+
+
+def draw_lights(screen, inter):
+    # RED = (255, 0, 0), GREEN = (0, 255, 0)
+    ns_color = (0, 255, 0) if inter.phase == "NS" else (255, 0, 0)
+    ew_color = (0, 255, 0) if inter.phase == "EW" else (255, 0, 0)
+
+    # Draw vertical lights (north/south)
+    if inter.row > 0:  # Show north light only if not in top row
+        pygame.draw.circle(screen, ns_color, (inter.cx, inter.cy - 30), 6)
+    if inter.row < inter.num_rows - 1:  # Show south light only if not in bottom row
+        pygame.draw.circle(screen, ns_color, (inter.cx, inter.cy + 30), 6)
+
+    # Draw horizontal lights (east/west)
+    if inter.col > 0:  # Show west light only if not in first column
+        pygame.draw.circle(screen, ew_color, (inter.cx - 30, inter.cy), 6)
+    if inter.col < inter.num_cols - 1:  # Show east light only if not in last column
+        pygame.draw.circle(screen, ew_color, (inter.cx + 30, inter.cy), 6)
+
+
+def draw_intersection(screen, inter):
+    draw_intersection_box(screen, inter)
+    draw_lights(screen, inter)
+
+
+def draw_roads(screen, grid):
+    for cy in grid.row_positions:
+        pygame.draw.rect(screen, (100, 100, 100), (
+            grid.col_positions[0],
+            cy - ROAD_WIDTH // 2,
+            grid.col_positions[-1] - grid.col_positions[0],
+            ROAD_WIDTH
+        ))
+
+    for cx in grid.col_positions:
+        pygame.draw.rect(screen, (100, 100, 100), (
+            cx - ROAD_WIDTH // 2,
+            grid.row_positions[0],
+            ROAD_WIDTH,
+            grid.row_positions[-1] - grid.row_positions[0]
+        ))
+
+
+class GridRenderer:
+    """Draws a Grid onto a pygame surface. The simulation itself never imports pygame.
+
+    The background, roads and intersection boxes never change, so they are drawn
+    once into a cached surface and blitted each frame; it is rebuilt only when
+    the screen size or the grid layout changes. Blitting it covers the whole
+    screen, so callers needn't clear it first.
+    """
+
+    def __init__(self, background=(30, 30, 30)):
+        self.background = background
+        self.glow_surface = pygame.Surface((ROAD_WIDTH * 2, ROAD_WIDTH * 2), pygame.SRCALPHA)
+        self.static_surface = None
+        self.static_key = None
+
+    def static_layer(self, screen, grid):
+        key = (screen.get_size(), tuple(grid.row_positions), tuple(grid.col_positions))
+        if key != self.static_key:
+            surface = pygame.Surface(screen.get_size(), 0, screen)  # Same pixel format, for fast blits
+            surface.fill(self.background)
+            draw_roads(surface, grid)
+            for inter in grid.intersections:
+                draw_intersection_box(surface, inter)
+            self.static_surface = surface
+            self.static_key = key
+        return self.static_surface
+
+    def draw(self, screen, grid, show_heatmap=True):
+        screen.blit(self.static_layer(screen, grid), (0, 0))
+
+        for inter in grid.intersections:
+            draw_lights(screen, inter)
+
+        for car in grid.cars:
+            draw_car(screen, car)
+
+        # Now loop over intersections only to render heat glow
+        if show_heatmap:
+            for inter in grid.intersections:
+                if inter.congestion_heat > 0.5:
+                    intensity = min(255, int((inter.congestion_heat - 0.5) * 40))
+                    pygame.draw.circle(self.glow_surface, (255, 0, 0, intensity), (ROAD_WIDTH, ROAD_WIDTH), ROAD_WIDTH)
+                    screen.blit(self.glow_surface, (inter.cx - ROAD_WIDTH, inter.cy - ROAD_WIDTH))
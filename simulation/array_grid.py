@@ -0,0 +1,455 @@
+# simulation/array_grid.py
+
+import numpy as np
+from simulation.grid import Grid, GRID_ROWS, GRID_COLS, ROAD_WIDTH, SIDEBAR_WIDTH, CAR_SPEED, CAR_ACCEL, SPILLOVER_THRESHOLD, MILD_STOP_TIME, SEVERE_STOP_TIME, fitness_score
+from simulation.car import Car, CAR_LENGTH, CAR_STOP_GAP, CAR_START_GAP, DIRECTIONS, CAR_STATES
+from simulation.snapshot import CAR_COLUMNS
+
+# Direction codes used by the array engine
+DIR_CODES = {d: i for i, d in enumerate(DIRECTIONS)}
+DIR_SIGN = np.array([-1.0, 1.0, 1.0, -1.0])      # +1 when the travel axis coordinate grows
+DIR_VERTICAL = np.array([True, True, False, False])
+
+STATE_MOVING = CAR_STATES.index("moving")
+STATE_WAITING = CAR_STATES.index("waiting")
+
+PHASE_CODES = {"NS": 0, "EW": 1, "ALL_RED": 2}
+
+
+class CarArrays:
+    """Structure-of-arrays storage for every car in an ArrayGrid.
+
+    Columns are preallocated to `capacity` and only the first `count` rows are live.
+    Row order matches spawn order, the same order the object engine updates cars in.
+    """
+
+    FIELDS = {
+        "x": np.float64, "y": np.float64, "velocity": np.float64, "stopped_time": np.float64,
+        "spawn_x": np.float64, "spawn_y": np.float64, "age": np.float64,
+        "max_speed": np.float64, "acceleration": np.float64,
+        "direction": np.int8, "state": np.int8, "entered_grid": bool,
+        "lane": np.int32, "next_stop": np.int32,
+    }
+
+    def __init__(self, capacity):
+        self.capacity = max(1, capacity)
+        self.count = 0
+        for name, dtype in self.FIELDS.items():
+            setattr(self, "_" + name, np.zeros(self.capacity, dtype=dtype))
+
+    def __getattr__(self, name):
+        # Expose live views (x, y, ...) of the preallocated columns
+        if name in type(self).FIELDS:
+            return self.__dict__["_" + name][:self.__dict__["count"]]
+        raise AttributeError(name)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        # Materialize read-only Car objects, e.g. for drawing or debug stats
+        for i in range(self.count):
+            car = Car(float(self._x[i]), float(self._y[i]), DIRECTIONS[self._direction[i]],
+                      max_speed=float(self._max_speed[i]), acceleration=float(self._acceleration[i]))
+            car.velocity = float(self._velocity[i])
+            car.stopped_time = float(self._stopped_time[i])
+            car.state = CAR_STATES[self._state[i]]
+            car.entered_grid = bool(self._entered_grid[i])
+            car.spawn_x = float(self._spawn_x[i])
+            car.spawn_y = float(self._spawn_y[i])
+            car.age = float(self._age[i])
+            yield car
+
+    def clear(self):
+        self.count = 0
+
+    def grow(self):
+        self.capacity *= 2
+        for name in self.FIELDS:
+            old = getattr(self, "_" + name)
+            new = np.zeros(self.capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, "_" + name, new)
+
+    def append(self, x, y, direction, max_speed, acceleration, **extra):
+        if self.count == self.capacity:
+            self.grow()
+        i = self.count
+        self._x[i] = x
+        self._y[i] = y
+        self._direction[i] = DIR_CODES[direction]
+        self._velocity[i] = 0.0
+        self._stopped_time[i] = 0.0
+        self._spawn_x[i] = x
+        self._spawn_y[i] = y
+        self._age[i] = 0.0
+        self._max_speed[i] = max_speed
+        self._acceleration[i] = acceleration
+        self._state[i] = STATE_MOVING
+        self._entered_grid[i] = False
+        self._next_stop[i] = 0
+        for name, value in extra.items():
+            getattr(self, "_" + name)[i] = value
+        self.count += 1
+
+    def compact(self, keep):
+        # Drop rows where `keep` is False, preserving the order of the survivors
+        n = int(np.count_nonzero(keep))
+        for name in self.FIELDS:
+            col = getattr(self, "_" + name)
+            col[:n] = col[:self.count][keep]
+        self.count = n
+
+
+class RoadLayout:
+    """Static road geometry of a Grid as arrays: intersection centres, road positions, speed limits."""
+
+    def __init__(self, grid):
+        self.inter_cx = np.array([inter.cx for inter in grid.intersections])
+        self.inter_cy = np.array([inter.cy for inter in grid.intersections])
+        self.num_intersections = len(grid.intersections)
+
+        rows, cols = len(grid.row_positions), len(grid.col_positions)
+        self.row_array = np.array(grid.row_positions)
+        self.col_array = np.array(grid.col_positions)
+        self.horizontal_limits = np.ones((rows, cols - 1))
+        for (row, col), limit in grid.road_speed_limits["horizontal"].items():
+            self.horizontal_limits[row, col] = limit
+        self.vertical_limits = np.ones((rows - 1, cols))
+        for (row, col), limit in grid.road_speed_limits["vertical"].items():
+            self.vertical_limits[row, col] = limit
+
+        # Stop lines per lane in travel order (see Grid.build_lane_stops). Each row is
+        # padded with a sentinel column that is never reached, which is also what
+        # index -1 (no stop behind us yet) wraps around to.
+        self.lane_ids = {key: i for i, key in enumerate(grid.lane_stops)}
+        width = max(len(stops) for stops in grid.lane_stops.values()) + 1
+        self.stop_axis = np.empty((len(self.lane_ids), width))
+        self.stop_index = np.full((len(self.lane_ids), width), -1, dtype=np.intp)
+        self.lane_road = np.zeros(len(self.lane_ids), dtype=np.intp)
+        index_of = {id(inter): i for i, inter in enumerate(grid.intersections)}
+        for key, lane in self.lane_ids.items():
+            direction = key[0]
+            first = grid.lane_stops[key][0]
+            self.lane_road[lane] = first.col if direction in ("N", "S") else first.row
+            self.stop_axis[lane] = np.inf if DIR_SIGN[DIR_CODES[direction]] > 0 else -np.inf
+            for k, inter in enumerate(grid.lane_stops[key]):
+                self.stop_axis[lane, k] = inter.cy if direction in ("N", "S") else inter.cx
+                self.stop_index[lane, k] = index_of[id(inter)]
+
+        self.min_x = -50
+        self.max_x = grid.window_width - SIDEBAR_WIDTH + 50
+        self.min_y = -50
+        self.max_y = grid.window_height + 50
+
+    def speed_limits(self, x, y, vertical, lane):
+        # Road index comes from the lane; the segment along it from a binary search
+        # counting the road positions strictly before the car (side="left")
+        rows, cols = len(self.row_array), len(self.col_array)
+        road = self.lane_road[lane]
+        limits = np.empty(len(x))
+
+        h = ~vertical
+        h_col = np.clip(np.searchsorted(self.col_array, x[h], side="left") - 1, 0, cols - 2)
+        limits[h] = self.horizontal_limits[road[h], h_col]
+
+        v_row = np.clip(np.searchsorted(self.row_array, y[vertical], side="left") - 1, 0, rows - 2)
+        limits[vertical] = self.vertical_limits[v_row, road[vertical]]
+        return limits
+
+    def lane_id(self, x, y, direction):
+        lateral = x if direction in ("N", "S") else y
+        return self.lane_ids[(direction, round(lateral))]
+
+    def in_bounds(self, x, y):
+        return (self.min_x <= x) & (x <= self.max_x) & (self.min_y <= y) & (y <= self.max_y)
+
+
+def green_mask(vertical, phases):
+    # Whether each car (rows) may pass each intersection (columns) under `phases`
+    return np.where(vertical[:, None], phases == PHASE_CODES["NS"], phases == PHASE_CODES["EW"])
+
+
+def advance_stop_cursor(cars, layout, sign, front):
+    # Move each car's next_stop past stop lines its front has reached and return
+    # the distance from the front bumper to the (new) next stop line
+    while True:
+        stop = layout.stop_axis[cars.lane, cars.next_stop]
+        ahead = np.where(sign > 0, stop - front, front - stop)
+        passed = ahead <= 0
+        if not passed.any():
+            return ahead
+        cars.next_stop[passed] += 1
+
+
+def lane_leaders(cars, group=None):
+    # Index of the next car ahead in the same lane (-1 for lane heads).
+    # Ties rank the later-spawned car behind, as Grid.build_lane_index does.
+    n = len(cars)
+    direction = cars.direction
+    vertical = DIR_VERTICAL[direction]
+    lateral = np.round(np.where(vertical, cars.x, cars.y))
+    progress = DIR_SIGN[direction] * np.where(vertical, cars.y, cars.x)
+    group = np.zeros(n, dtype=np.intp) if group is None else group
+
+    order = np.lexsort((-np.arange(n), progress, lateral, direction, group))
+    leaders = np.full(n, -1, dtype=np.intp)
+    if n > 1:
+        same_lane = (
+            (group[order[1:]] == group[order[:-1]]) &
+            (direction[order[1:]] == direction[order[:-1]]) &
+            (lateral[order[1:]] == lateral[order[:-1]])
+        )
+        leaders[order[:-1]] = np.where(same_lane, order[1:], -1)
+    return leaders
+
+
+def step_cars(cars, dt, layout, phases, group=None):
+    """Advance every live car by one tick, mirroring Car.update for each of them.
+
+    `phases` holds intersection phase codes with one row per grid and `group` maps
+    each car to its row (None for a single grid). Returns the index of each car's
+    nearest intersection and a mask of cars actively waiting at it.
+    """
+    n = len(cars)
+    x, y, direction = cars.x, cars.y, cars.direction
+    sign = DIR_SIGN[direction]
+    vertical = DIR_VERTICAL[direction]
+    half = CAR_LENGTH / 2
+    group = np.zeros(n, dtype=np.intp) if group is None else group
+
+    speed_factor = layout.speed_limits(x, y, vertical, cars.lane)
+    cars.age[:] += dt
+
+    entered = cars.entered_grid
+    entered |= np.hypot(x - cars.spawn_x, y - cars.spawn_y) > 100
+
+    # Red-light mask (positions before anyone moves, like Car.update). Only the
+    # next stop line on a car's lane can be within reach.
+    axis = np.where(vertical, y, x)
+    ahead = advance_stop_cursor(cars, layout, sign, axis + sign * half)
+    stop_phase = phases[group, layout.stop_index[cars.lane, cars.next_stop]]
+    stop_green = np.where(vertical, stop_phase == PHASE_CODES["NS"], stop_phase == PHASE_CODES["EW"])
+    red_light = entered & (0 < ahead) & (ahead < 35) & ~stop_green
+
+    # Velocity each car would reach if it is free to accelerate
+    velocity = cars.velocity
+    target = cars.max_speed * speed_factor
+    accel_rate = cars.acceleration * dt
+    free_velocity = np.where(
+        velocity < target, np.minimum(velocity + accel_rate, target),
+        np.where(velocity > target, np.maximum(velocity - accel_rate, target), velocity)
+    )
+    free_axis = axis + sign * (free_velocity * dt)
+    gap_limit = np.where(cars.state == STATE_WAITING, CAR_STOP_GAP, CAR_START_GAP)
+
+    # Whether a car is blocked depends on whether its leader moved this tick, so
+    # iterate to the fixed point; each pass settles at least one more car per lane.
+    leaders = lane_leaders(cars, group)
+    blocked = red_light.copy()
+    for _ in range(n + 1):
+        new_axis = np.where(blocked, axis, free_axis)
+
+        # A tied leader that did not move is not ahead of us; look past it
+        leader = leaders.copy()
+        while True:
+            valid = leader >= 0
+            other = new_axis[np.where(valid, leader, 0)]
+            strictly_ahead = np.where(sign > 0, other > axis, other < axis)
+            skip = valid & ~strictly_ahead
+            if not skip.any():
+                break
+            leader = np.where(skip, leaders[np.where(skip, leader, 0)], leader)
+
+        valid = leader >= 0
+        other = new_axis[np.where(valid, leader, 0)]
+        gap = np.where(sign > 0, (other - half) - (axis + half), (axis - half) - (other + half))
+        new_blocked = red_light | (valid & (gap < gap_limit))
+        if np.array_equal(new_blocked, blocked):
+            break
+        blocked = new_blocked
+
+    moving = ~blocked
+    velocity[:] = np.where(blocked, 0.0, free_velocity)
+    cars.state[blocked] = STATE_WAITING
+    cars.stopped_time[blocked] += dt
+    x[:] = np.where(moving & ~vertical, free_axis, x)
+    y[:] = np.where(moving & vertical, free_axis, y)
+
+    # Nearest-intersection wait accounting (positions after moving). The nearest is
+    # the stop line we last passed or the next one; ties go to the lower grid index.
+    advance_stop_cursor(cars, layout, sign, np.where(vertical, y, x) + sign * half)
+    behind = layout.stop_index[cars.lane, cars.next_stop - 1]
+    ahead_index = layout.stop_index[cars.lane, cars.next_stop]
+    dist_behind = np.where(behind >= 0, np.hypot(x - layout.inter_cx[behind], y - layout.inter_cy[behind]), np.inf)
+    dist_ahead = np.where(ahead_index >= 0, np.hypot(x - layout.inter_cx[ahead_index], y - layout.inter_cy[ahead_index]), np.inf)
+    take_behind = (dist_behind < dist_ahead) | ((dist_behind == dist_ahead) & (behind < ahead_index))
+    nearest = np.where(take_behind, behind, ahead_index)
+    nearest_phase = phases[group, nearest]
+    can_go = np.where(vertical, nearest_phase == PHASE_CODES["NS"], nearest_phase == PHASE_CODES["EW"])
+    waiting = (cars.state == STATE_WAITING) & ~can_go & (velocity < 0.01)
+    return nearest, waiting
+
+
+def long_waits(cars, layout, phases, group=None):
+    # Heat rule 2: per grid and intersection, is any car inside the box that has
+    # been actively waiting there for more than 4s?
+    num_groups = len(phases)
+    result = np.zeros((num_groups, layout.num_intersections), dtype=bool)
+    if len(cars) == 0:
+        return result
+
+    half_road = ROAD_WIDTH // 2
+    vertical = DIR_VERTICAL[cars.direction]
+    car_phases = phases[group] if group is not None else phases[:1]
+    inside = (
+        (np.abs(cars.x[:, None] - layout.inter_cx[None, :]) < half_road) &
+        (np.abs(cars.y[:, None] - layout.inter_cy[None, :]) < half_road)
+    )
+    active = ((cars.state == STATE_WAITING) & (cars.velocity < 0.01) & (cars.stopped_time > 4.0))[:, None]
+    hits = inside & active & ~green_mask(vertical, car_phases)
+    car_rows, inter_cols = np.nonzero(hits)
+    group_rows = group[car_rows] if group is not None else np.zeros(len(car_rows), dtype=np.intp)
+    result[group_rows, inter_cols] = True
+    return result
+
+
+class ArrayGrid(Grid):
+    """Grid whose cars live in NumPy arrays and are advanced with vectorized masks.
+
+    Produces the same fitness and throughput as the object engine: cars are still
+    resolved leader-first within each lane, the order in which Grid.update_only
+    visits them, but every car in every lane is processed in one array pass.
+    """
+
+    def __init__(self, headless=False, window_size=None, seed=None, rows=GRID_ROWS, cols=GRID_COLS):
+        super().__init__(headless=headless, window_size=window_size, seed=seed, rows=rows, cols=cols)
+        self.cars = CarArrays(self.max_cars)
+        self.layout = RoadLayout(self)
+
+    def spawn_car(self):
+        if len(self.cars) >= self.max_cars:
+            return
+        x, y, d = self.pick_spawn_point()
+        self.cars.append(x, y, d, CAR_SPEED, CAR_ACCEL, lane=self.layout.lane_id(x, y, d))
+
+    def car_columns(self, names=CAR_COLUMNS):
+        return {name: getattr(self.cars, name).copy() for name in names}
+
+    def load_car_columns(self, columns):
+        cars = self.cars
+        n = len(columns["x"])
+        cars.clear()
+        while cars.capacity < n:
+            cars.grow()
+        for name in CAR_COLUMNS:
+            getattr(cars, "_" + name)[:n] = columns[name]
+        cars.count = n
+        cars.next_stop[:] = 0  # Cursors catch up on the next step
+        cars.lane[:] = [self.layout.lane_id(x, y, DIRECTIONS[d])
+                        for x, y, d in zip(cars.x.tolist(), cars.y.tolist(), cars.direction.tolist())]
+
+    def update_cars(self, dt, phases):
+        self.waiting_cars = 0
+        self.spillovers = 0
+        if len(self.cars) == 0:
+            return
+        nearest, waiting = step_cars(self.cars, dt, self.layout, phases[None, :])
+        waiting_idx = nearest[waiting]
+
+        waiting_cars = np.bincount(waiting_idx, minlength=len(self.intersections))
+        waiting_time = np.zeros(len(self.intersections))
+        np.add.at(waiting_time, waiting_idx, dt)  # Sequential adds, same rounding as +=
+        for inter, count, total in zip(self.intersections, waiting_cars.tolist(), waiting_time.tolist()):
+            inter.waiting_cars += count
+            inter.waiting_time_total += total
+        self.waiting_cars = len(waiting_idx)
+        self.spillovers = int(np.count_nonzero(waiting_cars > SPILLOVER_THRESHOLD))
+
+    def update_congestion_heat(self, dt):
+        long_wait = long_waits(self.cars, self.layout, self.phase_array()[None, :])[0].tolist()
+
+        for inter, waited in zip(self.intersections, long_wait):
+            if inter.waiting_cars >= 3 or waited:
+                inter.congestion_heat = inter.congestion_heat * 0.9 + dt * 1.5
+            else:
+                inter.congestion_heat *= 0.9
+            inter.congestion_heat = max(0.0, min(inter.congestion_heat, 10.0))
+
+    def phase_array(self):
+        return np.array([PHASE_CODES[inter.phase] for inter in self.intersections], dtype=np.int8)
+
+    def update_only(self, dt, real_dt=None):
+        # Speed limits and nearest-intersection accounting happen inside the
+        # vectorized car step, so they are charged to "car_updates" here
+        prof = self.profiler
+        if prof is not None:
+            tick_start = lap = prof.start()
+
+        self.elapsed_time += dt
+
+        for inter in self.intersections:
+            inter.update(dt)
+        if prof is not None:
+            lap = prof.lap("intersections", lap)
+
+        self.update_cars(dt, self.phase_array())
+        if prof is not None:
+            lap = prof.lap("car_updates", lap)
+
+        self.heat_timer += dt
+        if self.heat_timer > 0.2:
+            self.update_congestion_heat(0.2)
+            self.heat_timer = 0
+        if prof is not None:
+            lap = prof.lap("congestion_heat", lap)
+
+        for inter in self.intersections:
+            inter.prev_waiting_cars = inter.waiting_cars
+            inter.prev_waiting_time = inter.waiting_time_total
+            inter.waiting_cars = 0
+            inter.waiting_time_total = 0.0
+
+        cars = self.cars
+        keep = self.layout.in_bounds(cars.x, cars.y)
+        exits = 0
+        if not keep.all():
+            for stopped in cars.stopped_time[~keep].tolist():
+                self.total_wait_time += stopped
+                self.cars_processed += 1
+                exits += 1
+            cars.compact(keep)
+        if prof is not None:
+            lap = prof.lap("culling", lap)
+        self.update_gridlock_timer(dt, exits)
+
+        self.avg_wait_time = self.total_wait_time / self.cars_processed if self.cars_processed > 0 else 0.0
+        self.throughput_cars_per_min = (self.cars_processed / self.elapsed_time * 60.0) if self.elapsed_time > 0 else 0.0
+
+        self.spawn_timer += dt
+        if self.headless:
+            while self.spawn_timer >= self.spawn_interval:
+                self.spawn_car()
+                self.spawn_timer -= self.spawn_interval
+        else:
+            if self.spawn_timer >= self.spawn_interval:
+                self.spawn_car()
+                self.spawn_timer = 0
+        if prof is not None:
+            lap = prof.lap("spawning", lap)
+
+        stopped_time = cars.stopped_time
+        self.mildly_stopped = int(np.count_nonzero(stopped_time > MILD_STOP_TIME))
+        self.severely_stopped = int(np.count_nonzero(stopped_time > SEVERE_STOP_TIME))
+        self.fitness = fitness_score(self.avg_wait_time, self.mildly_stopped, self.severely_stopped, len(cars),
+                                     self.waiting_cars, self.spillovers, self.cars_processed, dt)
+        self.total_congestion = self.waiting_cars
+        if prof is not None:
+            lap = prof.lap("fitness", lap)
+
+        if self.recorder is not None and dt > 0:
+            self.recorder.record(self, dt)
+            if prof is not None:
+                prof.lap("recording", lap)
+        if prof is not None:
+            prof.lap("update_only", tick_start)
@@ -0,0 +1,177 @@
+# simulation/batch_grid.py
+
+import random
+import numpy as np
+from simulation.grid import Grid, GRID_ROWS, GRID_COLS, CAR_SPEED, CAR_ACCEL, SPILLOVER_THRESHOLD, MILD_STOP_TIME, SEVERE_STOP_TIME, fitness_score
+from simulation.car import DIRECTIONS
+from simulation.array_grid import CarArrays, RoadLayout, PHASE_CODES, step_cars, long_waits
+from simulation.snapshot import CAR_COLUMNS
+
+
+class BatchCarArrays(CarArrays):
+    """CarArrays with a `member` column naming the population member each car belongs to."""
+
+    FIELDS = {**CarArrays.FIELDS, "member": np.int32}
+
+
+class BatchGrid:
+    """A population of headless grids, one per signal config, stepped together.
+
+    Every per-grid quantity carries a leading population dimension: intersection
+    phase/elapsed/wait counters are (N, intersections) arrays, scores are (N,)
+    arrays, and all members' cars share one BatchCarArrays tagged by `member`.
+    Each member draws from its own RNG, consuming it exactly as a lone grid does,
+    so a member seeded like a Simulator.run call reproduces that run. With a
+    `warm_start` snapshot every member forks from the same warmed-up traffic.
+    """
+
+    def __init__(self, configs, seeds=None, rngs=None, warm_start=None, rows=GRID_ROWS, cols=GRID_COLS,
+                 max_cars=None, spawn_interval=None):
+        template = Grid(headless=True, rows=rows, cols=cols)
+        # Traffic overrides, applied to the template as Simulator.make_grid applies them (None = the grid's default)
+        if max_cars is not None:
+            template.max_cars = max_cars
+        if spawn_interval is not None:
+            template.spawn_interval = spawn_interval
+        self.template = template
+        self.layout = RoadLayout(template)
+        self.size = len(configs)
+        if rngs is None and warm_start is not None and seeds is None:
+            rngs = [warm_start.make_rng() for _ in configs]
+        elif rngs is None:
+            seeds = seeds or [random.getrandbits(64) for _ in configs]
+            rngs = [random.Random(seed) for seed in seeds]
+            if warm_start is None:
+                for rng in rngs:
+                    for _ in template.intersections:
+                        rng.uniform(0, 5)  # Skip the offsets Intersection.__init__ would draw
+        self.rngs = rngs
+
+        self.max_cars = template.max_cars
+        self.spawn_interval = template.spawn_interval
+        self.spawn_timer = warm_start.spawn_timer if warm_start else 0.0
+        self.heat_timer = warm_start.heat_timer if warm_start else 0
+        self.elapsed_time = 0.0
+
+        shape = (self.size, self.layout.num_intersections)
+        self.ns_duration = np.full(shape, 5.0)
+        self.ew_duration = np.full(shape, 5.0)
+        self.phase = np.full(shape, PHASE_CODES["NS"], dtype=np.int8)
+        self.elapsed = np.zeros(shape)
+        for m, (config, rng) in enumerate(zip(configs, self.rngs)):
+            for i, cfg in enumerate(config):
+                self.ns_duration[m, i] = cfg["ns_duration"]
+                self.ew_duration[m, i] = cfg["ew_duration"]
+                if warm_start is None:
+                    self.elapsed[m, i] = rng.uniform(0, 3)  # Desync light timers
+
+        self.waiting_cars = np.zeros(shape, dtype=np.int64)
+        self.waiting_time_total = np.zeros(shape)
+        self.prev_waiting_cars = np.zeros(shape, dtype=np.int64)
+        self.prev_waiting_time = np.zeros(shape)
+        self.congestion_heat = np.zeros(shape)
+
+        self.total_wait_time = np.zeros(self.size)
+        self.cars_processed = np.zeros(self.size, dtype=np.int64)
+        self.avg_wait_time = np.zeros(self.size)
+        self.fitness = np.zeros(self.size)
+        self.gridlock_timer = np.zeros(self.size)
+
+        self.cars = BatchCarArrays(self.size * self.max_cars)
+        if warm_start is not None:
+            self.fork(warm_start)
+
+    def fork(self, snapshot):
+        # Every member starts from the snapshot's lights and a copy of its cars
+        self.phase[:] = [PHASE_CODES[phase] for phase in snapshot.phases]
+        self.elapsed[:] = snapshot.elapsed
+        self.congestion_heat[:] = snapshot.congestion_heat
+
+        n = len(snapshot)
+        columns = snapshot.cars
+        lanes = [self.layout.lane_id(x, y, DIRECTIONS[d])
+                 for x, y, d in zip(columns["x"].tolist(), columns["y"].tolist(), columns["direction"].tolist())]
+        cars = self.cars
+        while cars.capacity < n * self.size:
+            cars.grow()
+        for name in CAR_COLUMNS:
+            getattr(cars, "_" + name)[:n * self.size] = np.tile(columns[name], self.size)
+        cars.count = n * self.size
+        cars.lane[:] = np.tile(np.array(lanes, dtype=np.int32), self.size)
+        cars.next_stop[:] = 0
+        cars.member[:] = np.repeat(np.arange(self.size, dtype=np.int32), n)
+
+    def update_intersections(self, dt):
+        self.elapsed += dt
+        to_ew = (self.phase == PHASE_CODES["NS"]) & (self.elapsed >= self.ns_duration)
+        to_ns = (self.phase == PHASE_CODES["EW"]) & (self.elapsed >= self.ew_duration)
+        self.phase[to_ew] = PHASE_CODES["EW"]
+        self.phase[to_ns] = PHASE_CODES["NS"]
+        self.elapsed[to_ew | to_ns] = 0
+
+    def update_congestion_heat(self, dt):
+        build = (self.waiting_cars >= 3) | long_waits(self.cars, self.layout, self.phase, self.cars.member)
+        self.congestion_heat = np.where(build, self.congestion_heat * 0.9 + dt * 1.5, self.congestion_heat * 0.9)
+        np.clip(self.congestion_heat, 0.0, 10.0, out=self.congestion_heat)
+
+    def spawn_cars(self):
+        counts = np.bincount(self.cars.member, minlength=self.size)
+        for m in np.nonzero(counts < self.max_cars)[0].tolist():
+            x, y, d = self.template.pick_spawn_point(self.rngs[m])
+            self.cars.append(x, y, d, CAR_SPEED, CAR_ACCEL, member=m, lane=self.layout.lane_id(x, y, d))
+
+    def update_only(self, dt):
+        self.elapsed_time += dt
+        self.update_intersections(dt)
+
+        cars = self.cars
+        if len(cars):
+            nearest, waiting = step_cars(cars, dt, self.layout, self.phase, cars.member)
+            index = (cars.member[waiting], nearest[waiting])
+            np.add.at(self.waiting_cars, index, 1)
+            np.add.at(self.waiting_time_total, index, dt)  # Sequential adds, same rounding as +=
+
+        self.heat_timer += dt
+        if self.heat_timer > 0.2:
+            self.update_congestion_heat(0.2)
+            self.heat_timer = 0
+
+        self.prev_waiting_cars, self.waiting_cars = self.waiting_cars, self.prev_waiting_cars
+        self.prev_waiting_time, self.waiting_time_total = self.waiting_time_total, self.prev_waiting_time
+        self.waiting_cars[:] = 0
+        self.waiting_time_total[:] = 0.0
+
+        keep = self.layout.in_bounds(cars.x, cars.y)
+        exits = np.zeros(self.size, dtype=np.int64)
+        if not keep.all():
+            leaving = ~keep
+            np.add.at(self.total_wait_time, cars.member[leaving], cars.stopped_time[leaving])
+            exits = np.bincount(cars.member[leaving], minlength=self.size)
+            self.cars_processed += exits
+            cars.compact(keep)
+        # Same rule as Grid.update_gridlock_timer, per member
+        full = np.bincount(cars.member, minlength=self.size) >= self.max_cars
+        self.gridlock_timer = np.where(full & (exits == 0), self.gridlock_timer + dt, 0.0)
+
+        processed = self.cars_processed > 0
+        self.avg_wait_time = np.divide(self.total_wait_time, self.cars_processed,
+                                       out=np.zeros(self.size), where=processed)
+
+        self.spawn_timer += dt
+        while self.spawn_timer >= self.spawn_interval:
+            self.spawn_cars()
+            self.spawn_timer -= self.spawn_interval
+
+        self.compute_fitness(dt)
+
+    def compute_fitness(self, dt):
+        cars = self.cars
+        member = cars.member
+        mildly_stopped = np.bincount(member, weights=cars.stopped_time > MILD_STOP_TIME, minlength=self.size)
+        severely_stopped = np.bincount(member, weights=cars.stopped_time > SEVERE_STOP_TIME, minlength=self.size)
+        queued = np.bincount(member, minlength=self.size)
+        waiting_cars = self.prev_waiting_cars.sum(axis=1)
+        spillovers = (self.prev_waiting_cars > SPILLOVER_THRESHOLD).sum(axis=1)
+
+        self.fitness = fitness_score(self.avg_wait_time, mildly_stopped, severely_stopped, queued,
+                                     waiting_cars, spillovers, self.cars_processed, dt)
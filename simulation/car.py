@@ -1,4 +1,3 @@
-import pygame
 import math
 
 CAR_WIDTH = 12
@@ -7,6 +6,10 @@ CAR_COLOR = (0, 200, 255)
 CAR_STOP_GAP = 15
 CAR_START_GAP = 35
 
+# Index order doubles as the numeric codes used by array-backed car state
+DIRECTIONS = ("N", "S", "E", "W")
+CAR_STATES = ("moving", "waiting")
+
 class Car:
     def __init__(self, x, y, direction, max_speed=100, acceleration=50):
         self.x = x
@@ -23,9 +26,14 @@ class Car:
         self.spawn_y = y
         self.entered_grid = False
         self.age = 0.0
+        self.lane_rank = 0  # Position in the grid's sorted lane index (rear to front)
+        self.stops = None  # Intersections on this car's lane in travel order (set by the grid)
+        self.next_stop = 0  # Index into stops of the next intersection our front hasn't reached
+        self.road = None  # Row (E/W) or column (N/S) index of our road, cached by the grid
+        self.box = None  # Intersection whose box we're inside, tracked by the grid
 
 
-    def update(self, intersections, dt, cars):
+    def update(self, intersections, dt, lane):
         self.age += dt
 
         # Check if car has moved far enough to start obeying intersections
@@ -34,12 +42,20 @@ class Car:
             if dist_from_start > 100:
                 self.entered_grid = True
 
+        # Only the next stop line on our lane can be within reach; without a lane
+        # lookup fall back to checking every intersection
+        if self.stops is not None:
+            self.advance_stop_cursor()
+            upcoming = self.stops[self.next_stop:self.next_stop + 1]
+        else:
+            upcoming = intersections
+
         near_intersection = (
             self.entered_grid and 
-            any(self.is_near(inter) and not self.can_go(inter) for inter in intersections)
+            any(self.is_near(inter) and not self.can_go(inter) for inter in upcoming)
         )
 
-        if near_intersection or self.car_blocking_ahead(cars):
+        if near_intersection or self.car_blocking_ahead(lane):
             # Stop if there's a red light or car blocking
             self.velocity = 0.0
             self.state = "waiting"
@@ -69,14 +85,6 @@ class Car:
         elif self.direction == "W":
             self.x -= dist
 
-    def draw(self, screen):
-        if self.direction in ("N", "S"):
-            rect = pygame.Rect(self.x - CAR_WIDTH // 2, self.y - CAR_LENGTH // 2, CAR_WIDTH, CAR_LENGTH)
-        else:
-            rect = pygame.Rect(self.x - CAR_LENGTH // 2, self.y - CAR_WIDTH // 2, CAR_LENGTH, CAR_WIDTH)
-
-        pygame.draw.rect(screen, CAR_COLOR, rect)
-
     def is_near(self, intersection, threshold=35):
         lane_tolerance = 16  
 
@@ -93,6 +101,21 @@ class Car:
 
 
 
+    def distance_ahead(self, intersection):
+        # How far the intersection centre is ahead of our front bumper along the lane
+        if self.direction == "N":
+            return self.front_position() - intersection.cy
+        if self.direction == "S":
+            return intersection.cy - self.front_position()
+        if self.direction == "E":
+            return intersection.cx - self.front_position()
+        if self.direction == "W":
+            return self.front_position() - intersection.cx
+
+    def advance_stop_cursor(self):
+        while self.next_stop < len(self.stops) and self.distance_ahead(self.stops[self.next_stop]) <= 0:
+            self.next_stop += 1
+
     def can_go(self, intersection):
         if intersection.phase == "ALL_RED":
             return False
@@ -103,20 +126,18 @@ class Car:
         return False
 
 
-    def car_blocking_ahead(self, cars):
-        for other in cars:
-            if other is self:
-                continue
+    def car_blocking_ahead(self, lane):
+        # `lane` is this car's lane from the grid's index, sorted rear to front,
+        # so the first car ahead of us in it is our immediate leader.
+        for i in range(self.lane_rank + 1, len(lane)):
+            other = lane[i]
             if not self.is_in_same_lane(other):
                 continue
             edge_gap = self.edge_distance_to(other)
 
             if self.state == "waiting":
-                if edge_gap < CAR_STOP_GAP:
-                    return True
-            else:
-                if edge_gap < CAR_START_GAP:
-                    return True
+                return edge_gap < CAR_STOP_GAP
+            return edge_gap < CAR_START_GAP
         return False
 
 
@@ -150,6 +171,23 @@ class Car:
         return False
 
 
+    def lane_key(self):
+        # Cars never change lanes, so the lateral coordinate identifies the lane
+        if self.direction in ("N", "S"):
+            return (self.direction, round(self.x))
+        return (self.direction, round(self.y))
+
+    def lane_position(self):
+        # Distance travelled along the direction of travel (larger = further ahead)
+        if self.direction == "N":
+            return -self.y
+        elif self.direction == "S":
+            return self.y
+        elif self.direction == "E":
+            return self.x
+        elif self.direction == "W":
+            return -self.x
+
     def distance_to(self, other):
         if self.direction in ("N", "S"):
             return abs(self.y - other.y)
@@ -167,6 +205,13 @@ class Car:
             return self.x - self.length / 2
         
     def get_nearest_intersection(self, intersections):
+        # The nearest intersection is always on our own road: the one we last
+        # passed or the next one ahead. Keep grid order so ties resolve the same.
+        if self.stops is not None:
+            self.advance_stop_cursor()
+            intersections = sorted(self.stops[max(0, self.next_stop - 1):self.next_stop + 1],
+                                   key=lambda inter: (inter.row, inter.col))
+
         min_dist = float("inf")
         nearest = None
         for inter in intersections:
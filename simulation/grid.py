@@ -1,8 +1,11 @@
-import pygame
+import itertools
 import random
+from bisect import bisect_left
+import numpy as np
 from simulation.intersection import Intersection
-from simulation.car import Car
+from simulation.car import Car, DIRECTIONS, CAR_STATES
 from simulation.car import compute_lane_offset
+from simulation.snapshot import GridSnapshot, CAR_COLUMNS
 
 GRID_ROWS = 4
 GRID_COLS = 5
@@ -13,41 +16,85 @@ CAR_ACCEL = 50
 SCREEN_MARGIN = 60
 HEAVY_CONGESTION_THRESHOLD = 15
 SPILLOVER_THRESHOLD = 5
+THROUGHPUT_WEIGHT = 0.1  # Fitness reward per car that has left the grid
+MILD_STOP_TIME = 10.0    # Seconds stopped before a car counts as mildly stopped
+SEVERE_STOP_TIME = 20.0  # ... and as severely stopped
+MIN_BLOCK_SPACING = 150  # Closest the default layout packs adjacent intersections
+
+
+def default_window_size(rows, cols):
+    """Window a rows x cols grid is laid out in when none is given.
+
+    The classic 1200x1000 window, grown when the grid is too large for its
+    intersections to sit at least MIN_BLOCK_SPACING apart.
+    """
+    width = SIDEBAR_WIDTH + 2 * SCREEN_MARGIN + (cols - 1) * MIN_BLOCK_SPACING
+    height = 2 * SCREEN_MARGIN + (rows - 1) * MIN_BLOCK_SPACING
+    return max(1200, width), max(1000, height)
+
+
+def fitness_score(avg_wait_time, mildly_stopped, severely_stopped, queued, waiting_cars, spillovers,
+                  cars_processed, dt):
+    """Fitness (lower is better) from one tick's traffic statistics.
+
+    `waiting_cars` is the number of cars actively waiting at an intersection this
+    tick; each one also adds `dt` to the wait penalty. Takes scalars or per-member
+    NumPy arrays, so every engine scores with the same arithmetic.
+    """
+    heavy_congestion_penalty = queued - HEAVY_CONGESTION_THRESHOLD
+    heavy_congestion_penalty = heavy_congestion_penalty * (heavy_congestion_penalty > 0)
+    intersection_wait_penalty = waiting_cars * dt
+
+    car_weight = 0.05
+    time_weight = 0.02
+    norm_waiting_cars = waiting_cars * car_weight
+    norm_waiting_time = intersection_wait_penalty * time_weight
+
+    return (
+        0.4 * avg_wait_time +
+        1.0 * mildly_stopped +
+        2.0 * severely_stopped +
+        0.15 * heavy_congestion_penalty +
+        0.05 * waiting_cars +
+        0.02 * intersection_wait_penalty +
+        norm_waiting_cars +
+        norm_waiting_time -
+        THROUGHPUT_WEIGHT * cars_processed +
+        0.3 * spillovers
+    )
 
 
 class Grid:
-    def __init__(self, headless=False):
+    def __init__(self, headless=False, window_size=None, seed=None, rows=GRID_ROWS, cols=GRID_COLS):
         self.headless = headless
+        self.rows = rows
+        self.cols = cols
+        # Per-grid random stream; a seed makes the run (spawns, light offsets) reproducible
+        self.rng = random.Random(seed) if seed is not None else random
         self.max_cars = 40 if self.headless else 40
         self.heat_timer = 0
-        
-        if self.headless:
-            # self.window_height = info.current_h
-            self.window_width = 1200
-            self.window_height = 1000
-            self.glow_surface = None
-        else:
-            info = pygame.display.Info()
-            self.window_width = info.current_w
-            self.window_height = info.current_h
-            self.glow_surface = pygame.Surface((ROAD_WIDTH * 2, ROAD_WIDTH * 2), pygame.SRCALPHA)
+
+        # Drawing lives in rendering/, so the simulation never needs pygame; the
+        # live grid is sized to the window by whoever created it
+        self.window_width, self.window_height = window_size or default_window_size(rows, cols)
         
         self.grid_width = self.window_width - SIDEBAR_WIDTH
         self.grid_height = self.window_height
 
         self.col_positions = self.compute_positions(
-            GRID_COLS,
+            cols,
             left=SCREEN_MARGIN,
             right=self.window_width - SIDEBAR_WIDTH - SCREEN_MARGIN
         )
 
         self.row_positions = self.compute_positions(
-            GRID_ROWS,
+            rows,
             top=SCREEN_MARGIN,
             bottom=self.window_height - SCREEN_MARGIN
         )
 
         self.cars = []
+        self.lanes = {}
         self.spawn_timer = 0.0
         self.spawn_interval = 0.5 if headless else 1
 
@@ -57,25 +104,39 @@ class Grid:
         self.fitness = 0.0
         self.elapsed_time = 0.0
         self.throughput_cars_per_min = 0.0
+        self.gridlock_timer = 0.0
+
+        # Running statistics behind the fitness, kept up to date as cars move so a
+        # tick never has to rescan the cars or intersections to score itself
+        self.mildly_stopped = 0
+        self.severely_stopped = 0
+        self.waiting_cars = 0
+        self.spillovers = 0
+        self.total_congestion = 0
+
+        # Optional PhaseTimer (simulation.profiling) charged with each phase of a tick
+        self.profiler = None
+        # Optional TraceRecorder (simulation.trace) that every tick is appended to
+        self.recorder = None
 
         self.road_speed_limits = {
             "horizontal": {},
             "vertical": {}
         }
 
-        for row in range(GRID_ROWS):
-            for col in range(GRID_COLS - 1):
+        for row in range(rows):
+            for col in range(cols - 1):
                 self.road_speed_limits["horizontal"][(row, col)] = 1.0
-        for row in range(GRID_ROWS - 1):
-            for col in range(GRID_COLS):
+        for row in range(rows - 1):
+            for col in range(cols):
                 self.road_speed_limits["vertical"][(row, col)] = 0.5
 
         self.intersections = []
-        for row in range(GRID_ROWS):
-            for col in range(GRID_COLS):
+        for row in range(rows):
+            for col in range(cols):
                 cx = self.col_positions[col]
                 cy = self.row_positions[row]
-                inter = Intersection(col, row, cx, cy, GRID_ROWS, GRID_COLS)
+                inter = Intersection(col, row, cx, cy, rows, cols, rng=self.rng)
                 inter.waiting_cars = 0
                 inter.waiting_time_total = 0.0
                 inter.prev_waiting_cars = 0
@@ -83,6 +144,8 @@ class Grid:
                 inter.congestion_heat = 0.0
                 self.intersections.append(inter)
 
+        self.lane_stops = self.build_lane_stops()
+
     def compute_positions(self, count, left=None, right=None, top=None, bottom=None):
         if left is not None and right is not None:
             spacing = (right - left) / (count - 1)
@@ -93,79 +156,211 @@ class Grid:
         else:
             raise ValueError("Must specify left/right or top/bottom bounds.")
 
+    def build_lane_stops(self):
+        # Intersections each lane crosses, in the order a car driving it meets them
+        lane_stops = {}
+        for col, cx in enumerate(self.col_positions):
+            column = [inter for inter in self.intersections if inter.col == col]
+            for d in ("N", "S"):
+                dx, _ = compute_lane_offset(d)
+                stops = sorted(column, key=lambda inter: inter.cy, reverse=(d == "N"))
+                lane_stops[(d, round(cx + dx))] = stops
+        for row, cy in enumerate(self.row_positions):
+            row_inters = [inter for inter in self.intersections if inter.row == row]
+            for d in ("E", "W"):
+                _, dy = compute_lane_offset(d)
+                stops = sorted(row_inters, key=lambda inter: inter.cx, reverse=(d == "W"))
+                lane_stops[(d, round(cy + dy))] = stops
+        return lane_stops
+
+    def build_lane_index(self, extra=()):
+        # Group cars by lane and sort each lane rear to front so a car only has to
+        # look at its immediate leader. Ties rank the later-updated car behind,
+        # matching what a full scan would see after the earlier car has moved.
+        # `extra` cars are indexed as leaders but never updated.
+        lanes = {}
+        for index, car in enumerate(itertools.chain(self.cars, extra)):
+            lanes.setdefault(car.lane_key(), []).append((car.lane_position(), -index, car))
+
+        self.lanes = {}
+        for key, entries in lanes.items():
+            entries.sort(key=lambda e: (e[0], e[1]))
+            lane = [car for _, _, car in entries]
+            for rank, car in enumerate(lane):
+                car.lane_rank = rank
+            self.lanes[key] = lane
+
+    def nearest_road(self, car):
+        # Row (E/W) or column (N/S) index of the road a car drives on. Cars never
+        # change lanes, so this is computed once at spawn and cached on the car.
+        if car.direction in ("E", "W"):
+            return min(range(self.rows), key=lambda r: abs(car.y - self.row_positions[r]))
+        return min(range(self.cols), key=lambda c: abs(car.x - self.col_positions[c]))
+
     def get_speed_limit(self, car):
+        road = car.road if car.road is not None else self.nearest_road(car)
+        # bisect_left counts the road positions strictly before the car
         if car.direction in ("E", "W"):
-            row = min(range(GRID_ROWS), key=lambda r: abs(car.y - self.row_positions[r]))
-            col = max(0, min(GRID_COLS - 2, sum(car.x > cp for cp in self.col_positions) - 1))
-            return self.road_speed_limits["horizontal"].get((row, col), 1.0)
+            col = max(0, min(self.cols - 2, bisect_left(self.col_positions, car.x) - 1))
+            return self.road_speed_limits["horizontal"].get((road, col), 1.0)
         else:
-            col = min(range(GRID_COLS), key=lambda c: abs(car.x - self.col_positions[c]))
-            row = max(0, min(GRID_ROWS - 2, sum(car.y > rp for rp in self.row_positions) - 1))
-            return self.road_speed_limits["vertical"].get((row, col), 1.0)
-
-    def draw(self, screen, dt, show_heatmap=True, real_dt=None):
-        # Always run simulation logic
-        self.update_only(dt, real_dt)
-
-        # Skip rendering if headless or no screen
-        if self.headless or screen is None:
-            return
-
-        # --- Visual-only rendering ---
-        for cy in self.row_positions:
-            pygame.draw.rect(screen, (100, 100, 100), (
-                self.col_positions[0],
-                cy - ROAD_WIDTH // 2,
-                self.col_positions[-1] - self.col_positions[0],
-                ROAD_WIDTH
-            ))
-
-        for cx in self.col_positions:
-            pygame.draw.rect(screen, (100, 100, 100), (
-                cx - ROAD_WIDTH // 2,
-                self.row_positions[0],
-                ROAD_WIDTH,
-                self.row_positions[-1] - self.row_positions[0]
-            ))
-
-        for inter in self.intersections:
-            inter.draw(screen)
+            row = max(0, min(self.rows - 2, bisect_left(self.row_positions, car.y) - 1))
+            return self.road_speed_limits["vertical"].get((row, road), 1.0)
 
-        for car in self.cars:
-            car.draw(screen)
-
-        # Now loop over intersections only to render heat glow
-        for inter in self.intersections:
-            if inter.congestion_heat > 0.5 and self.glow_surface is not None:
-                intensity = min(255, int((inter.congestion_heat - 0.5) * 40))
-                
-                if show_heatmap:
-                    pygame.draw.circle(self.glow_surface, (255, 0, 0, intensity), (ROAD_WIDTH, ROAD_WIDTH), ROAD_WIDTH)
-                    screen.blit(self.glow_surface, (inter.cx - ROAD_WIDTH, inter.cy - ROAD_WIDTH))
-
-
-    def spawn_car(self):
-        if len(self.cars) >= self.max_cars:
-            return
-        edge = random.choices(["N", "S", "E", "W"], weights=[1, 1, 3, 3])[0]
+    def pick_spawn_point(self, rng=None):
+        rng = rng or self.rng
+        edge = rng.choices(["N", "S", "E", "W"], weights=[1, 1, 3, 3])[0]
 
         if edge == "N":
-            col = random.choice(self.col_positions)
+            col = rng.choice(self.col_positions)
             x, y, d = col, self.window_height, "N"
         elif edge == "S":
-            col = random.choice(self.col_positions)
+            col = rng.choice(self.col_positions)
             x, y, d = col, 0, "S"
         elif edge == "E":
-            row = random.choice(self.row_positions)
+            row = rng.choice(self.row_positions)
             x, y, d = 0, row, "E"
         elif edge == "W":
-            row = random.choice(self.row_positions)
+            row = rng.choice(self.row_positions)
             x, y, d = self.window_width - SIDEBAR_WIDTH, row, "W"
 
-    
         dx, dy = compute_lane_offset(d)
-        self.cars.append(Car(x + dx, y  + dy, d, max_speed=CAR_SPEED, acceleration=CAR_ACCEL))
+        return x + dx, y + dy, d
+
+    def add_car(self, x, y, d):
+        car = Car(x, y, d, max_speed=CAR_SPEED, acceleration=CAR_ACCEL)
+        car.stops = self.lane_stops.get(car.lane_key())
+        car.road = self.nearest_road(car)
+        self.cars.append(car)
+        return car
+
+    def spawn_car(self):
+        if len(self.cars) >= self.max_cars:
+            return
+        self.add_car(*self.pick_spawn_point())
+
+    def car_columns(self, names=CAR_COLUMNS):
+        # The named CAR_COLUMNS of every car, as arrays in car order
+        columns = {
+            name: np.array([getattr(car, name) for car in self.cars], dtype=CAR_COLUMNS[name])
+            for name in names if name not in ("direction", "state")
+        }
+        if "direction" in names:
+            columns["direction"] = np.array([DIRECTIONS.index(car.direction) for car in self.cars], dtype=np.int8)
+        if "state" in names:
+            columns["state"] = np.array([CAR_STATES.index(car.state) for car in self.cars], dtype=np.int8)
+        return columns
+
+    def load_car_columns(self, columns):
+        self.cars = []
+        self.clear_boxes()
+        for row in zip(*(columns[name].tolist() for name in CAR_COLUMNS)):
+            self.add_car_row(row)
+        self.count_stopped()
+
+    def car_row(self, car):
+        # One car as a tuple of CAR_COLUMNS values, the form cars travel in between processes
+        return tuple(DIRECTIONS.index(car.direction) if name == "direction" else
+                     CAR_STATES.index(car.state) if name == "state" else
+                     getattr(car, name) for name in CAR_COLUMNS)
+
+    def make_car(self, row):
+        state = dict(zip(CAR_COLUMNS, row))
+        car = Car(state["x"], state["y"], DIRECTIONS[state["direction"]])
+        car.state = CAR_STATES[state["state"]]
+        for name in ("velocity", "stopped_time", "spawn_x", "spawn_y", "age", "max_speed", "acceleration", "entered_grid"):
+            setattr(car, name, state[name])
+        return car
+
+    def add_car_row(self, row):
+        # Add a car from car_row(); callers keep the stopped-car counters in step
+        car = self.make_car(row)
+        car.stops = self.lane_stops.get(car.lane_key())
+        car.road = self.nearest_road(car)
+        self.cars.append(car)
+        return car
+
+    def count_stopped(self):
+        # Recount the stopped-car statistics from scratch, after replacing self.cars
+        self.mildly_stopped = sum(1 for c in self.cars if c.stopped_time > MILD_STOP_TIME)
+        self.severely_stopped = sum(1 for c in self.cars if c.stopped_time > SEVERE_STOP_TIME)
+
+    def clear_cars(self):
+        self.cars.clear()
+        self.count_stopped()
+        self.clear_boxes()
+
+    def clear_boxes(self):
+        # Forget which cars sit in which box; the next update re-files them
+        for inter in self.intersections:
+            inter.box_cars.clear()
+
+    def locate_box(self, car):
+        # Intersection box the car is inside, if any. Only the boxes either side of
+        # its stop cursor can hold it; without a lane lookup check every one.
+        if car.stops is not None:
+            candidates = car.stops[max(0, car.next_stop - 1):car.next_stop + 1]
+        else:
+            candidates = self.intersections
+        half = ROAD_WIDTH // 2
+        for inter in candidates:
+            if abs(car.x - inter.cx) < half and abs(car.y - inter.cy) < half:
+                return inter
+        return None
+
+    def move_to_box(self, car, box):
+        if box is car.box:
+            return
+        if car.box is not None:
+            car.box.box_cars.discard(car)
+        if box is not None:
+            box.box_cars.add(car)
+        car.box = box
+
+    def snapshot(self):
+        return GridSnapshot(
+            cars=self.car_columns(),
+            phases=tuple(inter.phase for inter in self.intersections),
+            elapsed=tuple(inter.elapsed for inter in self.intersections),
+            congestion_heat=tuple(inter.congestion_heat for inter in self.intersections),
+            spawn_timer=self.spawn_timer,
+            heat_timer=self.heat_timer,
+            rng_state=self.rng.getstate(),
+        )
+
+    def restore(self, snapshot):
+        # Fork from a snapshot: take over its traffic, lights and timers, and start
+        # this run's statistics from zero
+        self.load_car_columns(snapshot.cars)
+        for inter, phase, elapsed, heat in zip(self.intersections, snapshot.phases, snapshot.elapsed, snapshot.congestion_heat):
+            inter.phase = phase
+            inter.elapsed = elapsed
+            inter.congestion_heat = heat
+            inter.waiting_cars = 0
+            inter.waiting_time_total = 0.0
+        self.spawn_timer = snapshot.spawn_timer
+        self.heat_timer = snapshot.heat_timer
+        self.rng = snapshot.make_rng()
+
+        self.total_wait_time = 0.0
+        self.cars_processed = 0
+        self.avg_wait_time = 0.0
+        self.fitness = 0.0
+        self.elapsed_time = 0.0
+        self.throughput_cars_per_min = 0.0
+        self.gridlock_timer = 0.0
+
+    def close(self):
+        # Nothing to release; engines that run in worker processes stop them here
+        pass
 
+    def update_gridlock_timer(self, dt, exits):
+        # Seconds the grid has sat at max_cars without a single car leaving. A flowing
+        # grid drains several cars a second, so a long streak means it has locked up.
+        if exits or len(self.cars) < self.max_cars:
+            self.gridlock_timer = 0.0
+        else:
+            self.gridlock_timer += dt
     
     def update_congestion_heat(self, dt):
         for inter in self.intersections:
@@ -175,11 +370,9 @@ class Grid:
             if inter.waiting_cars >= 3:
                 should_build_heat = True
 
-            # Rule 2: any car near this intersection with wait time > 4s
-            for car in self.cars:
-                dx = abs(car.x - inter.cx)
-                dy = abs(car.y - inter.cy)
-                if dx < ROAD_WIDTH // 2 and dy < ROAD_WIDTH // 2 and car.is_actively_waiting(inter) and car.stopped_time > 4.0:
+            # Rule 2: any car inside this intersection's box with wait time > 4s
+            for car in inter.box_cars:
+                if car.is_actively_waiting(inter) and car.stopped_time > 4.0:
                     should_build_heat = True
                     break
 
@@ -193,25 +386,73 @@ class Grid:
             inter.congestion_heat = max(0.0, min(inter.congestion_heat, 10.0))
 
     def update_only(self, dt, real_dt=None):
+        prof = self.profiler
+        if prof is not None:
+            tick_start = lap = prof.start()
+
         # Update elapsed time for throughput calculation
         self.elapsed_time += dt
         
         for inter in self.intersections:
             inter.update(dt)
-
+        if prof is not None:
+            lap = prof.lap("intersections", lap)
+
+        self.build_lane_index()
+        if prof is not None:
+            lap = prof.lap("lane_index", lap)
+        self.waiting_cars = 0
+        self.spillovers = 0
+        processed_before = self.cars_processed
+        right = self.window_width - SIDEBAR_WIDTH + 50
+        bottom = self.window_height + 50
+        # Cars that drive off the grid are culled as we go, compacting the list in
+        # place. They are far from every intersection box, so the heat rule below
+        # never misses them.
+        kept = 0
         for car in self.cars:
+            stopped_before = car.stopped_time
             car.road_speed_factor = self.get_speed_limit(car)
-            car.update(self.intersections, dt, self.cars)
+            if prof is not None:
+                lap = prof.lap("speed_limits", lap, per_item=True)
+            car.update(self.intersections, dt, self.lanes[car.lane_key()])
+            if stopped_before <= MILD_STOP_TIME < car.stopped_time:
+                self.mildly_stopped += 1
+            if stopped_before <= SEVERE_STOP_TIME < car.stopped_time:
+                self.severely_stopped += 1
+            if prof is not None:
+                lap = prof.lap("car_updates", lap, per_item=True)
+
             nearest = car.get_nearest_intersection(self.intersections)
             if nearest and car.is_actively_waiting(nearest):
                 nearest.waiting_cars += 1
                 nearest.waiting_time_total += dt
+                self.waiting_cars += 1
+                if nearest.waiting_cars == SPILLOVER_THRESHOLD + 1:
+                    self.spillovers += 1
+            if prof is not None:
+                lap = prof.lap("nearest_intersection", lap, per_item=True)
+
+            if -50 <= car.x <= right and -50 <= car.y <= bottom:
+                self.move_to_box(car, self.locate_box(car))
+                self.cars[kept] = car
+                kept += 1
+            else:
+                self.move_to_box(car, None)
+                self.total_wait_time += car.stopped_time
+                self.cars_processed += 1
+                self.mildly_stopped -= car.stopped_time > MILD_STOP_TIME
+                self.severely_stopped -= car.stopped_time > SEVERE_STOP_TIME
+            if prof is not None:
+                lap = prof.lap("culling", lap, per_item=True)
+        del self.cars[kept:]
 
-            
         self.heat_timer += dt
         if self.heat_timer > 0.2:
             self.update_congestion_heat(0.2)
             self.heat_timer = 0
+        if prof is not None:
+            lap = prof.lap("congestion_heat", lap)
 
         for inter in self.intersections:
             inter.prev_waiting_cars = inter.waiting_cars
@@ -219,20 +460,14 @@ class Grid:
             inter.waiting_cars = 0
             inter.waiting_time_total = 0.0
 
-
-        remaining = []
-        for c in self.cars:
-            if -50 <= c.x <= self.window_width - SIDEBAR_WIDTH + 50 and -50 <= c.y <= self.window_height + 50:
-                remaining.append(c)
-            else:
-                self.total_wait_time += c.stopped_time
-                self.cars_processed += 1
-        self.cars = remaining
+        self.update_gridlock_timer(dt, self.cars_processed - processed_before)
 
         self.avg_wait_time = self.total_wait_time / self.cars_processed if self.cars_processed > 0 else 0.0
         
         # Calculate throughput (cars per minute)
         self.throughput_cars_per_min = (self.cars_processed / self.elapsed_time * 60.0) if self.elapsed_time > 0 else 0.0
+        if prof is not None:
+            lap = prof.lap("statistics", lap)
 
         self.spawn_timer += dt
         if self.headless:
@@ -243,30 +478,18 @@ class Grid:
             if self.spawn_timer >= self.spawn_interval:
                 self.spawn_car()
                 self.spawn_timer = 0
-
-        mildly_stopped = sum(1 for c in self.cars if c.stopped_time > 10.0)
-        severely_stopped = sum(1 for c in self.cars if c.stopped_time > 20.0)
-        queued = len(self.cars)
-        intersection_congestion = sum(i.prev_waiting_cars for i in self.intersections)
-        intersection_wait_penalty = sum(i.prev_waiting_time for i in self.intersections)
-        heavy_congestion_penalty = max(0, queued - HEAVY_CONGESTION_THRESHOLD)
-
-        car_weight = 0.05
-        time_weight = 0.02
-        norm_waiting_cars = sum(i.prev_waiting_cars * car_weight for i in self.intersections)
-        norm_waiting_time = sum(i.prev_waiting_time * time_weight for i in self.intersections)
-        spillovers = sum(1 for i in self.intersections if i.prev_waiting_cars > SPILLOVER_THRESHOLD)
-
-        self.fitness = (
-            0.4 * self.avg_wait_time +
-            1.0 * mildly_stopped +
-            2.0 * severely_stopped +
-            0.15 * heavy_congestion_penalty +
-            0.05 * intersection_congestion +
-            0.02 * intersection_wait_penalty +
-            norm_waiting_cars +
-            norm_waiting_time -
-            0.1 * self.cars_processed + 
-            0.3 * spillovers
-        )
-        self.total_congestion = intersection_congestion
+        if prof is not None:
+            lap = prof.lap("spawning", lap)
+
+        self.fitness = fitness_score(self.avg_wait_time, self.mildly_stopped, self.severely_stopped, len(self.cars),
+                                     self.waiting_cars, self.spillovers, self.cars_processed, dt)
+        self.total_congestion = self.waiting_cars
+        if prof is not None:
+            lap = prof.lap("fitness", lap)
+
+        if self.recorder is not None and dt > 0:
+            self.recorder.record(self, dt)
+            if prof is not None:
+                prof.lap("recording", lap)
+        if prof is not None:
+            prof.lap("update_only", tick_start)
@@ -0,0 +1,267 @@
+# simulation/partition.py
+
+import math
+import multiprocessing
+from bisect import bisect_right
+from simulation.grid import Grid, GRID_ROWS, GRID_COLS, CAR_SPEED, CAR_ACCEL, MILD_STOP_TIME, SEVERE_STOP_TIME, fitness_score
+from simulation.car import Car
+from simulation.snapshot import CAR_COLUMNS
+
+# Cars this close to a tile edge are mirrored into the neighbouring tile as
+# read-only leaders, so followers across the edge keep their gap. Comfortably
+# more than a car length plus the start gap plus one step of travel.
+HALO = 100.0
+
+# Where x, y and stopped_time sit in a car row (see Grid.car_row)
+X, Y, STOPPED = (list(CAR_COLUMNS).index(name) for name in ("x", "y", "stopped_time"))
+
+
+def split(count, parts):
+    """Split range(count) into `parts` contiguous, near-equal (start, stop) blocks."""
+    parts = max(1, min(parts, count))
+    bounds = [round(i * count / parts) for i in range(parts + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def tile_range(positions, block):
+    # A tile's edges sit halfway between its outermost roads and its neighbours';
+    # the outer tiles run on to infinity, covering spawns and exits
+    start, stop = block
+    low = -math.inf if start == 0 else (positions[start - 1] + positions[start]) / 2
+    high = math.inf if stop == len(positions) else (positions[stop - 1] + positions[stop]) / 2
+    return low, high
+
+
+class TileGrid(Grid):
+    """The part of a partitioned grid simulated by one worker process.
+
+    Keeps the full road geometry but only the intersections in its block of rows
+    and columns, and only the cars inside its region. Every step it takes in the
+    cars handed over by its neighbours, sees their cars near its edges as ghosts,
+    and hands back the cars that crossed out of its region. It never spawns; the
+    PartitionedGrid that owns it does that for the whole grid.
+    """
+
+    def __init__(self, rows, cols, window_size, row_block, col_block):
+        super().__init__(headless=True, window_size=window_size, rows=rows, cols=cols)
+        self.intersections = [inter for inter in self.intersections
+                              if row_block[0] <= inter.row < row_block[1] and col_block[0] <= inter.col < col_block[1]]
+        self.lane_stops = self.build_lane_stops()
+        self.x_range = tile_range(self.col_positions, col_block)
+        self.y_range = tile_range(self.row_positions, row_block)
+        self.spawn_interval = math.inf
+        self.ghosts = []
+
+    def build_lane_index(self, extra=()):
+        super().build_lane_index(self.ghosts)
+
+    def configure(self, lights):
+        for inter, (ns, ew, elapsed, phase) in zip(self.intersections, lights):
+            inter.ns_duration = ns
+            inter.ew_duration = ew
+            inter.elapsed = elapsed
+            inter.phase = phase
+
+    def step(self, dt, arrivals, ghosts):
+        """Advance one tick; return (cars leaving the tile, cars near its edges, stats)."""
+        for row in arrivals:
+            car = self.add_car_row(row)
+            self.mildly_stopped += car.stopped_time > MILD_STOP_TIME
+            self.severely_stopped += car.stopped_time > SEVERE_STOP_TIME
+        self.ghosts = [self.make_car(row) for row in ghosts]
+
+        self.update_only(dt)
+
+        (x0, x1), (y0, y1) = self.x_range, self.y_range
+        leaving, halo, kept = [], [], 0
+        for car in self.cars:
+            if not (x0 <= car.x < x1 and y0 <= car.y < y1):
+                self.move_to_box(car, None)
+                self.mildly_stopped -= car.stopped_time > MILD_STOP_TIME
+                self.severely_stopped -= car.stopped_time > SEVERE_STOP_TIME
+                leaving.append(self.car_row(car))
+                continue
+            self.cars[kept] = car
+            kept += 1
+            if car.x - x0 < HALO or x1 - car.x < HALO or car.y - y0 < HALO or y1 - car.y < HALO:
+                halo.append(self.car_row(car))
+        del self.cars[kept:]
+
+        stats = (len(self.cars), self.mildly_stopped, self.severely_stopped, self.waiting_cars,
+                 self.spillovers, self.cars_processed, self.total_wait_time)
+        return leaving, halo, stats
+
+
+def tile_worker(conn, rows, cols, window_size, row_block, col_block):
+    """Process entry point: serve configure/step requests for one tile until closed."""
+    tile = TileGrid(rows, cols, window_size, row_block, col_block)
+    while True:
+        message = conn.recv()
+        if message[0] == "step":
+            conn.send(tile.step(*message[1:]))
+        elif message[0] == "configure":
+            tile.configure(message[1])
+        elif message[0] == "close":
+            break
+    conn.close()
+
+
+class PartitionedGrid:
+    """A large headless grid split into tiles that step in parallel worker processes.
+
+    The grid's rows and columns are cut into a `tiles` = (tile_rows, tile_cols)
+    arrangement of TileGrids, each in its own process. Every update_only, all tiles
+    advance one tick at once; cars that crossed a tile edge are then handed to the
+    tile they drove into, and cars near an edge are mirrored to the neighbour so
+    its followers see them. Spawning, gridlock detection and the fitness are done
+    here for the grid as a whole, from statistics the tiles report.
+
+    Cars only see their neighbours across an edge as of the previous tick, and a
+    queue that backs up across an edge is charged to the tile's own intersection,
+    so results are close to, but not identical with, a single-process Grid.
+    Call close() to stop the workers.
+    """
+
+    def __init__(self, headless=True, window_size=None, seed=None, rows=GRID_ROWS, cols=GRID_COLS, tiles=(2, 2)):
+        # A template grid holds the geometry, intersections and RNG; it never steps
+        template = Grid(headless=True, window_size=window_size, seed=seed, rows=rows, cols=cols)
+        self.template = template
+        self.headless = True
+        self.rows = rows
+        self.cols = cols
+        self.intersections = template.intersections
+        self.rng = template.rng
+        self.max_cars = template.max_cars
+        self.spawn_interval = template.spawn_interval
+        self.spawn_timer = 0.0
+        self.profiler = None
+
+        self.car_count = 0
+        self.total_wait_time = 0.0
+        self.cars_processed = 0
+        self.avg_wait_time = 0.0
+        self.fitness = 0.0
+        self.elapsed_time = 0.0
+        self.throughput_cars_per_min = 0.0
+        self.gridlock_timer = 0.0
+
+        row_blocks = split(rows, tiles[0])
+        col_blocks = split(cols, tiles[1])
+        self.x_cuts = [tile_range(template.col_positions, block)[1] for block in col_blocks[:-1]]
+        self.y_cuts = [tile_range(template.row_positions, block)[1] for block in row_blocks[:-1]]
+        self.tile_cols = len(col_blocks)
+
+        # Spawned (not forked) workers, so they never inherit a window
+        context = multiprocessing.get_context("spawn")
+        window = (template.window_width, template.window_height)
+        self.connections, self.processes, self.regions, self.tile_lights = [], [], [], []
+        for row_block in row_blocks:
+            for col_block in col_blocks:
+                parent, child = context.Pipe()
+                process = context.Process(target=tile_worker, daemon=True,
+                                          args=(child, rows, cols, window, row_block, col_block))
+                process.start()
+                child.close()
+                self.connections.append(parent)
+                self.processes.append(process)
+                self.regions.append((tile_range(template.col_positions, col_block),
+                                     tile_range(template.row_positions, row_block)))
+                self.tile_lights.append([inter for inter in self.intersections
+                                         if row_block[0] <= inter.row < row_block[1]
+                                         and col_block[0] <= inter.col < col_block[1]])
+        self.arrivals = [[] for _ in self.connections]
+        self.ghosts = [[] for _ in self.connections]
+        self.configured = False
+
+    def tile_of(self, x, y):
+        return bisect_right(self.y_cuts, y) * self.tile_cols + bisect_right(self.x_cuts, x)
+
+    def configure(self):
+        # Lights are set on self.intersections before the first tick; ship them out
+        for conn, inters in zip(self.connections, self.tile_lights):
+            conn.send(("configure", [(i.ns_duration, i.ew_duration, i.elapsed, i.phase) for i in inters]))
+        self.configured = True
+
+    def spawn_car(self):
+        if self.car_count >= self.max_cars:
+            return
+        x, y, d = self.template.pick_spawn_point()
+        car = Car(x, y, d, max_speed=CAR_SPEED, acceleration=CAR_ACCEL)
+        self.arrivals[self.tile_of(x, y)].append(self.template.car_row(car))
+        self.car_count += 1
+
+    def update_only(self, dt, real_dt=None):
+        prof = self.profiler
+        if prof is not None:
+            tick_start = lap = prof.start()
+        if not self.configured:
+            self.configure()
+        self.elapsed_time += dt
+
+        for conn, arrivals, ghosts in zip(self.connections, self.arrivals, self.ghosts):
+            conn.send(("step", dt, arrivals, ghosts))
+        replies = [conn.recv() for conn in self.connections]
+        if prof is not None:
+            lap = prof.lap("tile_steps", lap)
+
+        self.arrivals = [[] for _ in self.connections]
+        self.ghosts = [[] for _ in self.connections]
+        queued = mildly_stopped = severely_stopped = waiting_cars = spillovers = processed = 0
+        total_wait = 0.0
+        for tile, (leaving, halo, stats) in enumerate(replies):
+            for row in leaving:
+                self.arrivals[self.tile_of(row[X], row[Y])].append(row)
+                # In transit this tick, but still on the grid
+                queued += 1
+                mildly_stopped += row[STOPPED] > MILD_STOP_TIME
+                severely_stopped += row[STOPPED] > SEVERE_STOP_TIME
+            for row in halo:
+                for other, ((x0, x1), (y0, y1)) in enumerate(self.regions):
+                    if other != tile and x0 - HALO <= row[X] < x1 + HALO and y0 - HALO <= row[Y] < y1 + HALO:
+                        self.ghosts[other].append(row)
+            cars, mild, severe, waiting, spill, tile_processed, tile_wait = stats
+            queued += cars
+            mildly_stopped += mild
+            severely_stopped += severe
+            waiting_cars += waiting
+            spillovers += spill
+            processed += tile_processed
+            total_wait += tile_wait
+        if prof is not None:
+            lap = prof.lap("routing", lap)
+
+        exits = processed - self.cars_processed
+        self.cars_processed = processed
+        self.total_wait_time = total_wait
+        self.car_count = queued
+        # Same rule as Grid.update_gridlock_timer, for the grid as a whole
+        if exits or self.car_count < self.max_cars:
+            self.gridlock_timer = 0.0
+        else:
+            self.gridlock_timer += dt
+
+        self.avg_wait_time = self.total_wait_time / self.cars_processed if self.cars_processed > 0 else 0.0
+        self.throughput_cars_per_min = (self.cars_processed / self.elapsed_time * 60.0) if self.elapsed_time > 0 else 0.0
+
+        self.spawn_timer += dt
+        while self.spawn_timer >= self.spawn_interval:
+            self.spawn_car()
+            self.spawn_timer -= self.spawn_interval
+        if prof is not None:
+            lap = prof.lap("spawning", lap)
+
+        self.fitness = fitness_score(self.avg_wait_time, mildly_stopped, severely_stopped, self.car_count,
+                                     waiting_cars, spillovers, self.cars_processed, dt)
+        if prof is not None:
+            prof.lap("fitness", lap)
+            prof.lap("update_only", tick_start)
+
+    def close(self):
+        for conn in self.connections:
+            try:
+                conn.send(("close",))
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+        self.connections, self.processes = [], []
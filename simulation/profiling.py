@@ -0,0 +1,76 @@
+import json
+import time
+
+# Phase each phase is nested in. Shares are reported against the parent when it
+# was timed too; otherwise a phase counts as top level.
+PHASE_PARENTS = {
+    # Per tick, inside Grid/ArrayGrid/PartitionedGrid.update_only
+    **dict.fromkeys(("intersections", "lane_index", "speed_limits", "car_updates", "nearest_intersection",
+                     "culling", "congestion_heat", "spawning", "fitness", "recording", "statistics",
+                     "tile_steps", "routing"), "update_only"),
+    # Simulator.run
+    "update_only": "run",
+    "run_setup": "run",
+    # One optimizer evaluation (a single config or a batch)
+    "run": "evaluation",
+    "warm_start": "evaluation",
+    "cache": "evaluation",
+    "pool_wait": "evaluation",
+}
+
+
+class PhaseTimer:
+    """Wall time accumulated per named phase of the simulation loop.
+
+    Attach one as `grid.profiler` (or pass it to Simulator.run) and the hot loop
+    reports each phase through lap(); with no profiler attached the loop only
+    pays for an `is not None` check. Each phase's share is of its parent in
+    PHASE_PARENTS (per-tick phases of "update_only", runs of "evaluation", ...),
+    and top-level phases share the sum of the top-level totals, so every share
+    is at most 1. Phases timed once per car (lap with per_item=True) count one
+    call per car, so they report no per-call mean.
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.calls = {}
+        self.per_item = set()
+
+    def start(self):
+        return time.perf_counter()
+
+    def lap(self, phase, since, per_item=False):
+        """Charge the time since `since` to `phase` and return now, to start the next lap."""
+        if per_item:
+            self.per_item.add(phase)
+        now = time.perf_counter()
+        self.totals[phase] = self.totals.get(phase, 0.0) + (now - since)
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        return now
+
+    def reset(self):
+        self.totals = {}
+        self.calls = {}
+        self.per_item = set()
+
+    def summary(self):
+        # Copy first: the loop may be adding phases from another thread
+        totals, calls, per_item = dict(self.totals), dict(self.calls), set(self.per_item)
+        parents = {phase: PHASE_PARENTS.get(phase) if PHASE_PARENTS.get(phase) in totals else None
+                   for phase in totals}
+        top_total = sum(total for phase, total in totals.items() if parents[phase] is None)
+        summary = {}
+        for phase, total in sorted(totals.items(), key=lambda item: -item[1]):
+            parent = parents[phase]
+            whole = totals[parent] if parent is not None else top_total
+            entry = {"total_s": total, "calls": calls.get(phase, 0)}
+            if phase not in per_item:
+                entry["mean_ms"] = 1000.0 * total / calls[phase] if calls.get(phase) else 0.0
+            entry["parent"] = parent
+            entry["share"] = total / whole if whole > 0 else 0.0
+            summary[phase] = entry
+        return summary
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
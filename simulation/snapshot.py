@@ -0,0 +1,40 @@
+# simulation/snapshot.py
+
+import random
+import numpy as np
+
+# Car columns captured in a snapshot; direction and state use the index codes of
+# simulation.car.DIRECTIONS / CAR_STATES, the same encoding as CarArrays
+CAR_COLUMNS = {
+    "x": np.float64, "y": np.float64, "velocity": np.float64, "stopped_time": np.float64,
+    "spawn_x": np.float64, "spawn_y": np.float64, "age": np.float64,
+    "max_speed": np.float64, "acceleration": np.float64,
+    "direction": np.int8, "state": np.int8, "entered_grid": bool,
+}
+
+
+class GridSnapshot:
+    """Compact copy of a running Grid: car columns, light phases and spawn/heat timers.
+
+    Either engine can take one (Grid.snapshot) and fork from it (Grid.restore);
+    restoring copies a few arrays instead of deep-copying Car objects. The RNG
+    state is kept too, so every fork sees the same future arrivals unless it is
+    given its own seed.
+    """
+
+    def __init__(self, cars, phases, elapsed, congestion_heat, spawn_timer, heat_timer, rng_state):
+        self.cars = cars                        # {column: ndarray}, see CAR_COLUMNS
+        self.phases = phases                    # Per intersection, grid order
+        self.elapsed = elapsed
+        self.congestion_heat = congestion_heat
+        self.spawn_timer = spawn_timer
+        self.heat_timer = heat_timer
+        self.rng_state = rng_state
+
+    def __len__(self):
+        return len(self.cars["x"])
+
+    def make_rng(self):
+        rng = random.Random()
+        rng.setstate(self.rng_state)
+        return rng
@@ -0,0 +1,180 @@
+# simulation/trace.py
+
+import json
+import os
+from collections import namedtuple
+import numpy as np
+from simulation.car import DIRECTIONS, CAR_STATES
+
+TRACE_VERSION = 1
+
+# Per-car columns, one row per car per tick, in the grid's car order
+TRACE_COLUMNS = {
+    "x": np.float32, "y": np.float32, "velocity": np.float32,
+    "direction": np.int8, "state": np.int8,
+}
+
+# Per-tick columns: simulated time since recording began, running car-row total
+# (where each tick's cars end), and one light phase (0 = NS green, 1 = EW green)
+# and heat per intersection
+TICK_COLUMNS = {
+    "time": np.float64, "ends": np.int64, "phases": np.int8, "heat": np.float32,
+}
+
+PHASES = ("NS", "EW")
+
+# What the renderer needs of a car, rebuilt from a trace row
+TracedCar = namedtuple("TracedCar", ["x", "y", "direction", "velocity", "state"])
+
+
+def column_path(path, name):
+    return os.path.join(path, name + ".bin")
+
+
+class TraceRecorder:
+    """Streams every tick of a grid into a columnar trace directory.
+
+    Attach one as `grid.recorder` (or pass it to Simulator.run). Each column is
+    a flat binary file of fixed-width values appended in blocks of `flush_every`
+    ticks, so memory use stays flat however long the run and a crash loses at
+    most the last block. A meta.json beside the columns describes the grid.
+    Call close() when done.
+    """
+
+    def __init__(self, path, grid, flush_every=256, meta=None):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.flush_every = flush_every
+        info = {
+            "version": TRACE_VERSION,
+            "rows": grid.rows,
+            "cols": grid.cols,
+            "window_size": [grid.window_width, grid.window_height],
+            "car_columns": {name: np.dtype(dtype).str for name, dtype in TRACE_COLUMNS.items()},
+            "tick_columns": {name: np.dtype(dtype).str for name, dtype in TICK_COLUMNS.items()},
+            **(meta or {}),
+        }
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(info, f, indent=2)
+
+        self.files = {name: open(column_path(path, name), "wb") for name in (*TRACE_COLUMNS, *TICK_COLUMNS)}
+        self.buffers = {name: [] for name in self.files}
+        self.rows = 0
+        self.ticks = 0
+        self.clock = 0.0  # Own clock: the live grid's elapsed_time restarts when a config is locked in
+
+    def record(self, grid, dt):
+        columns = grid.car_columns(TRACE_COLUMNS)
+        for name, column in columns.items():
+            self.buffers[name].append(column)
+        self.rows += len(columns["x"])
+        self.clock += dt
+        self.buffers["time"].append(self.clock)
+        self.buffers["ends"].append(self.rows)
+        self.buffers["phases"].append([PHASES.index(inter.phase) for inter in grid.intersections])
+        self.buffers["heat"].append([inter.congestion_heat for inter in grid.intersections])
+        self.ticks += 1
+        if len(self.buffers["time"]) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        for name, dtype in TRACE_COLUMNS.items():
+            if self.buffers[name]:
+                self.files[name].write(np.concatenate(self.buffers[name]).astype(dtype, copy=False).tobytes())
+        # Tick columns last, so a torn trace never indexes car rows that aren't there
+        for name, dtype in TICK_COLUMNS.items():
+            if self.buffers[name]:
+                self.files[name].write(np.asarray(self.buffers[name], dtype=dtype).tobytes())
+        for name, f in self.files.items():
+            self.buffers[name] = []
+            f.flush()
+
+    def close(self):
+        if self.files:
+            self.flush()
+            for f in self.files.values():
+                f.close()
+            self.files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def map_column(path, name, dtype, width=1):
+    # Read-only memory map of a column; numpy can't map an empty file
+    file = column_path(path, name)
+    if os.path.getsize(file) < np.dtype(dtype).itemsize * width:
+        return np.zeros((0, width) if width > 1 else 0, dtype=dtype)
+    column = np.memmap(file, dtype=dtype, mode="r")
+    if width > 1:
+        column = column[:len(column) // width * width].reshape(-1, width)
+    return column
+
+
+class TraceReader:
+    """Random access to a recorded trace without loading it.
+
+    Every column is memory-mapped, so opening even a multi-gigabyte trace is
+    instant and a frame only pages in its own rows. A trace cut short by a crash
+    is read up to its last complete tick.
+    """
+
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != TRACE_VERSION:
+            raise ValueError(f"Unsupported trace version {self.meta.get('version')!r} in {path}")
+        self.path = path
+        self.rows = self.meta["rows"]
+        self.cols = self.meta["cols"]
+        self.window_size = tuple(self.meta["window_size"])
+        size = self.rows * self.cols
+
+        self.cars = {name: map_column(path, name, dtype) for name, dtype in TRACE_COLUMNS.items()}
+        self.time = map_column(path, "time", TICK_COLUMNS["time"])
+        self.ends = map_column(path, "ends", TICK_COLUMNS["ends"])
+        self.phases = map_column(path, "phases", TICK_COLUMNS["phases"], size)
+        self.heat = map_column(path, "heat", TICK_COLUMNS["heat"], size)
+
+        ticks = min(len(self.time), len(self.ends), len(self.phases), len(self.heat))
+        car_rows = min(len(column) for column in self.cars.values())
+        # Drop trailing ticks whose cars never made it to disk
+        self.ticks = int(np.searchsorted(self.ends[:ticks], car_rows, side="right"))
+
+    def __len__(self):
+        return self.ticks
+
+    @property
+    def duration(self):
+        return float(self.time[self.ticks - 1]) if self.ticks else 0.0
+
+    def tick_at(self, t):
+        """Index of the first tick at or after simulated time `t` (clamped to the trace)."""
+        if not self.ticks:
+            raise IndexError("empty trace")
+        return min(int(np.searchsorted(self.time[:self.ticks], t)), self.ticks - 1)
+
+    def car_rows(self, tick):
+        start = int(self.ends[tick - 1]) if tick > 0 else 0
+        return start, int(self.ends[tick])
+
+    def frame(self, tick):
+        """(time, {column: array view}, phases, heat) for one tick."""
+        start, end = self.car_rows(tick)
+        cars = {name: column[start:end] for name, column in self.cars.items()}
+        return float(self.time[tick]), cars, self.phases[tick], self.heat[tick]
+
+    def apply(self, grid, tick):
+        # Pose a grid of the same layout as this tick, for the renderer to draw
+        _, cars, phases, heat = self.frame(tick)
+        for inter, phase, glow in zip(grid.intersections, phases.tolist(), heat.tolist()):
+            inter.phase = PHASES[phase]
+            inter.congestion_heat = glow
+        grid.cars = [
+            TracedCar(x, y, DIRECTIONS[d], v, CAR_STATES[s])
+            for x, y, v, d, s in zip(cars["x"].tolist(), cars["y"].tolist(), cars["velocity"].tolist(),
+                                     cars["direction"].tolist(), cars["state"].tolist())
+        ]